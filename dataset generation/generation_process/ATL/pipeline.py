@@ -80,14 +80,19 @@ def _build_type_graph(capabilities: List[Dict[str, Any]]) -> Dict[str, Any]:
         outs = set(c.get("output_types", []) or [])
         tool_io[name] = {"in": ins, "out": outs}
 
-    follow_edges: Dict[str, List[str]] = {k: [] for k in tool_io.keys()}
+    # Bucket tools by input type so each tool only meets the tools that can
+    # consume its outputs (MegamodelRegistry.find_transformation_chains covers
+    # longer chains).
     names = list(tool_io.keys())
-    for i, a in enumerate(names):
-        for b in names:
-            if a == b:
-                continue
-            if tool_io[a]["out"] and tool_io[a]["out"].intersection(tool_io[b]["in"]):
-                follow_edges[a].append(b)
+    position = {name: i for i, name in enumerate(names)}
+    consumers: Dict[str, List[str]] = {}
+    for name in names:
+        for in_type in tool_io[name]["in"]:
+            consumers.setdefault(in_type, []).append(name)
+    follow_edges: Dict[str, List[str]] = {}
+    for a in names:
+        nexts = {b for out_type in tool_io[a]["out"] for b in consumers.get(out_type, []) if b != a}
+        follow_edges[a] = sorted(nexts, key=position.__getitem__)
     precede_edges: Dict[str, List[str]] = {k: [] for k in tool_io.keys()}
     for a, bs in follow_edges.items():
         for b in bs:
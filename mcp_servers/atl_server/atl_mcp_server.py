@@ -3,8 +3,12 @@ import re
 import sys
 import os
 import json
+import asyncio
 import subprocess
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 from mcp.server.fastmcp import FastMCP
+from mcp.types import ToolAnnotations
+from src.mcp_ext.batch import register_batch_tool
 from typing import Dict, Any, List
     # Add /tools endpoint to expose all registered tools
 from fastapi import FastAPI
@@ -24,6 +28,9 @@ logger = logging.getLogger('atl_mcp_server')
 # Initialize the MCP server
 mcp = FastMCP("atl")
 
+# Declared on tools that only read, so clients may cache their results
+READ_ONLY = ToolAnnotations(readOnlyHint=True, idempotentHint=True)
+
 def fetch_transformations() -> list:
     """Fetch enabled transformations from the ATL server."""
     result = subprocess.run(['curl', '-X', 'GET', f'{ATL_SERVER_BASE}/transformations/enabled'], 
@@ -88,7 +95,7 @@ def _extract_from_content(content: str) -> str:
 
     return None
 
-@mcp.tool(name="extract_input_metamodel_name", description="Extracts the metamodel name from an XMI file. The input should be a file path to an XMI file. Returns the metamodel name (like 'Class', 'Grafcet', 'ECORE', or 'KM3').")
+@mcp.tool(name="extract_input_metamodel_name", description="Extracts the metamodel name from an XMI file. The input should be a file path to an XMI file. Returns the metamodel name (like 'Class', 'Grafcet', 'ECORE', or 'KM3').", annotations=READ_ONLY)
 async def get_input_metamodel(file_path: str) -> str:
     """Extract the metamodel name from an XMI file."""
     try:
@@ -117,6 +124,7 @@ def get_transformation_names() -> List[str]:
         "List sample source model paths for enabled transformations. "
         "Optionally provide a transformation_name to filter the results."
     ),
+    annotations=READ_ONLY,
 )
 async def list_transformation_samples(transformation_name: str = "") -> str:
     """Return sample sources for transformations, optionally filtered by name.
@@ -127,7 +135,7 @@ async def list_transformation_samples(transformation_name: str = "") -> str:
     """
     try:
         cmd = ['curl', '-s', '-X', 'GET', f'{ATL_SERVER_BASE}/transformations/samples']
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        result = await asyncio.to_thread(subprocess.run, cmd, capture_output=True, text=True, check=True)
         data = json.loads(result.stdout)
 
         if transformation_name:
@@ -150,26 +158,34 @@ for t in transformations:
     def create_apply_transformation(trans_name: str):
         @mcp.tool(name=f"apply_{trans_name}_transformation_tool", 
                  description=create_transformation_description(trans_name))
-        async def apply_transformation(file_path: str) -> str:
-            """Apply an ATL transformation to a model file."""
+        async def apply_transformation(file_path: str = "", model_content: str = "") -> str:
+            """Apply an ATL transformation to a model file, or to model content passed in memory."""
             try:
                 # Handle dictionary input if needed
                 if isinstance(file_path, dict):
                     file_path = next(iter(file_path.values()), '')
                 
+                transformation_name = trans_name
+                url = f'{ATL_SERVER_BASE}/transformation/{transformation_name}/apply'
+                if model_content:
+                    # Output of a previous step: stream it to curl instead of writing a file
+                    command = ['curl', '-X', 'POST', url, '-F', 'IN=@-;filename=input.xmi']
+                    result = await asyncio.to_thread(subprocess.run, command, input=model_content,
+                                                     capture_output=True, text=True, check=True)
+                    return f"Transformation {transformation_name} applied successfully:\n{result.stdout}"
+                
                 file_path = str(file_path).strip()
                 if not os.path.exists(file_path):
                     return f"Error: File not found at {file_path}"
                 
-                transformation_name = trans_name
                 # Prepare the command for the transformation
                 command = [
                     'curl', 
                     '-X', 'POST',
-                    f'{ATL_SERVER_BASE}/transformation/{transformation_name}/apply', 
+                    url, 
                     '-F', f'IN=@{file_path}'
                 ]
-                result = subprocess.run(command, capture_output=True, text=True, check=True)
+                result = await asyncio.to_thread(subprocess.run, command, capture_output=True, text=True, check=True)
                 return f"Transformation {transformation_name} applied successfully:\n{result.stdout}"
             except subprocess.CalledProcessError as e:
                 return f"Error applying transformation: {e.stderr}"
@@ -179,13 +195,14 @@ for t in transformations:
 
     def create_get_transformation(trans_name: str):
         @mcp.tool(name=f"list_transformation_{trans_name}_tool", 
-                 description=generate_get_tool_description(trans_name))
+                 description=generate_get_tool_description(trans_name),
+                 annotations=READ_ONLY)
         async def get_transformation_info() -> str:
             """Get details about a specific ATL transformation."""
             try:
                 transformation_name = trans_name
                 command = ['curl', '-X', 'GET', f'{ATL_SERVER_BASE}/transformation/{transformation_name}']
-                result = subprocess.run(command, capture_output=True, text=True, check=True)
+                result = await asyncio.to_thread(subprocess.run, command, capture_output=True, text=True, check=True)
                 return f"Transformation '{transformation_name}':\n{result.stdout}"
             except subprocess.CalledProcessError as e:
                 return f"Error fetching transformation: {e.stderr}"
@@ -195,6 +212,9 @@ for t in transformations:
     create_apply_transformation(name)
     create_get_transformation(name)
 
+# Lets clients send many of the calls above in one request
+register_batch_tool(mcp)
+
 if __name__ == "__main__":
 
     app = FastAPI()
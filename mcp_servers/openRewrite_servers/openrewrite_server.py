@@ -1,7 +1,11 @@
 import logging
+import os
 import sys
 import json
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 from mcp.server.fastmcp import FastMCP
+from mcp.types import ToolAnnotations
+from src.mcp_ext.batch import register_batch_tool
 from fastapi import FastAPI
 import uvicorn
 # Start FastAPI server in a separate thread
@@ -17,6 +21,9 @@ logger = logging.getLogger('openrewrite_mcp_server')
 # Initialize the MCP server
 mcp = FastMCP("openrewrite")
 
+# Declared on tools that only read, so clients may cache their results
+READ_ONLY = ToolAnnotations(readOnlyHint=True, idempotentHint=True)
+
 # Recipe definitions
 RECIPES = [
     {
@@ -121,7 +128,8 @@ for recipe in RECIPES:
             return f"Recipe '{name}' applied successfully"
 
         # Get details tool
-        @mcp.tool(name=f"get_{name}_details_tool", description=f"Get details for the '{name}' OpenRewrite recipe.")
+        @mcp.tool(name=f"get_{name}_details_tool", description=f"Get details for the '{name}' OpenRewrite recipe.",
+                  annotations=READ_ONLY)
         async def get_recipe_details_tool() -> str:
             return json.dumps(recipe_obj, indent=2)
 
@@ -132,7 +140,8 @@ for recipe in RECIPES:
 
 @mcp.tool(
     name="list_all_recipes_tool",
-    description="List all available OpenRewrite recipes with their descriptions and input requirements."
+    description="List all available OpenRewrite recipes with their descriptions and input requirements.",
+    annotations=READ_ONLY
 )
 async def list_all_recipes() -> str:
     """List all available OpenRewrite recipes."""
@@ -144,7 +153,8 @@ async def list_all_recipes() -> str:
 
 @mcp.tool(
     name="get_recipe_details_tool",
-    description="Get detailed information about a specific OpenRewrite recipe by name."
+    description="Get detailed information about a specific OpenRewrite recipe by name.",
+    annotations=READ_ONLY
 )
 async def get_recipe_details(recipe_name: str) -> str:
     """Get details about a specific recipe."""
@@ -154,6 +164,10 @@ async def get_recipe_details(recipe_name: str) -> str:
     return f"Recipe '{recipe_name}' not found."
 
 
+# Lets clients send many of the calls above in one request
+register_batch_tool(mcp)
+
+
 if __name__ == "__main__":
     app = FastAPI()
 
@@ -10,6 +10,7 @@ import os
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_community.vectorstores import DocArrayInMemorySearch
+from src.agents.embedding_cache import CachedEmbeddings
 from src.core.megamodel import MegamodelRegistry
 from src.agents.workflow import WorkflowExecutor
 from src.agents.planning import WorkflowPlan, PlanStep, AgentGoal
@@ -32,7 +33,7 @@ class MCPAgent:
             max_retries=2
         )
         # Embeddings and vector stores for RAG
-        self.embeddings = OpenAIEmbeddings(model=OPENAI_EMBEDDING_MODEL)
+        self.embeddings = CachedEmbeddings(OpenAIEmbeddings(model=OPENAI_EMBEDDING_MODEL), OPENAI_EMBEDDING_MODEL)
         self.tool_index = None
         self.model_index = None
         self.tool_registry = {}
@@ -0,0 +1,89 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import gc
+import argparse
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from src.core.am3 import TerminalModel
+from src.agents.execution import MCPInvocation
+
+TOOL_NAMES = [f"apply_{name}_transformation_tool" for name in ("Class2Relational", "KM32EMF", "Families2Persons", "Grafcet2PetriNet")]
+SERVER_NAMES = ["atl_server", "emf_server", "openrewrite_server"]
+
+
+# Pre-slots layouts, kept here as the baseline
+@dataclass
+class DictEntity:
+    uri: str
+    name: str = ""
+    metadata: dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        if not self.name:
+            self.name = self.uri.split('/')[-1] if '/' in self.uri else self.uri
+
+@dataclass
+class DictTerminalModel(DictEntity):
+    conformsTo: Optional[Any] = None
+    model_type: str = "terminal"
+    content_path: Optional[str] = None
+    instance_data: Optional[dict] = None
+
+@dataclass
+class DictMCPInvocation:
+    tool_name: str
+    server_name: str
+    arguments: Dict[str, Any]
+    result: Dict[str, Any] = field(default_factory=dict)
+    success: bool = True
+    timestamp: datetime = field(default_factory=datetime.now)
+
+
+def _fresh(name: str) -> str:
+    # Names decoded from JSON/MCP responses are distinct string objects
+    return "".join(list(name))
+
+
+def measure(factory, count: int) -> float:
+    """Bytes allocated per record when building `count` records"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = [factory(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return (after - before) / count
+
+
+def entity_factory(cls):
+    return lambda i: cls(uri=f"models/{i}.xmi")
+
+
+def invocation_factory(cls):
+    return lambda i: cls(
+        tool_name=_fresh(TOOL_NAMES[i % len(TOOL_NAMES)]),
+        server_name=_fresh(SERVER_NAMES[i % len(SERVER_NAMES)]),
+        arguments={},
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bytes per entity and per invocation, dict-backed vs slotted")
+    parser.add_argument("--records", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"{'record':>15} {'before (B)':>11} {'after (B)':>10} {'saved':>7}")
+    for label, before_cls, after_cls, factory in (
+        ("TerminalModel", DictTerminalModel, TerminalModel, entity_factory),
+        ("MCPInvocation", DictMCPInvocation, MCPInvocation, invocation_factory),
+    ):
+        before = measure(factory(before_cls), args.records)
+        after = measure(factory(after_cls), args.records)
+        print(f"{label:>15} {before:>11.0f} {after:>10.0f} {1 - after / before:>7.0%}")
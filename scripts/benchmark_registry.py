@@ -0,0 +1,61 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import time
+import argparse
+
+from src.core.am3 import Entity, Model, ReferenceModel, TransformationModel, TerminalModel
+from src.core.megamodel import MegamodelRegistry
+
+SIZES = [1_000, 10_000, 100_000]
+
+
+def build_registry(size: int) -> MegamodelRegistry:
+    """Registry holding `size` entities spread over the AM3 model kinds"""
+    registry = MegamodelRegistry()
+    metamodels = [ReferenceModel(uri=f"mm/{i}.ecore") for i in range(max(1, size // 100))]
+    for mm in metamodels:
+        registry.register_entity(mm)
+    for i in range(size - len(metamodels)):
+        kind = i % 3
+        if kind == 0:
+            entity = TerminalModel(uri=f"models/{i}.xmi", conformsTo=metamodels[i % len(metamodels)])
+        elif kind == 1:
+            entity = TransformationModel(uri=f"atl/{i}.atl")
+        else:
+            entity = Entity(uri=f"entities/{i}")
+        registry.register_entity(entity)
+    return registry
+
+
+def time_lookup(registry: MegamodelRegistry, entity_type: type, repeat: int) -> float:
+    """Average seconds per find_entities_by_type call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        registry.find_entities_by_type(entity_type)
+    return (time.perf_counter() - start) / repeat
+
+
+def time_scan(registry: MegamodelRegistry, entity_type: type, repeat: int) -> float:
+    """Average seconds per full isinstance scan (the pre-index behaviour)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        [e for e in registry.entities.values() if isinstance(e, entity_type)]
+    return (time.perf_counter() - start) / repeat
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark MegamodelRegistry type lookups")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'entities':>10} {'type':>20} {'matches':>8} {'indexed (ms)':>13} {'scan (ms)':>10}")
+    for size in SIZES:
+        registry = build_registry(size)
+        for entity_type in (ReferenceModel, Model):
+            matches = len(registry.find_entities_by_type(entity_type))
+            indexed = time_lookup(registry, entity_type, args.repeat) * 1000
+            scan = time_scan(registry, entity_type, args.repeat) * 1000
+            print(f"{size:>10} {entity_type.__name__:>20} {matches:>8} {indexed:>13.3f} {scan:>10.3f}")
@@ -0,0 +1,63 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import time
+import argparse
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import DocArrayInMemorySearch
+
+from src.agents.vector_index import VectorIndex
+
+SIZES = [100, 10_000, 100_000]
+QUERIES = [
+    "transform a Class model into a Relational model",
+    "list the available transformations",
+    "convert Families to Persons",
+    "apply the UML2 to Java transformation",
+]
+
+
+def tool_texts(size: int):
+    """Tool index texts shaped like the ones MCPAgent builds"""
+    return [
+        f"tool name: apply_T{i}2U{i}_transformation_tool\nserver: server{i % 20}\ndescription: Apply transformation T{i}2U{i}"
+        for i in range(size)
+    ]
+
+
+def time_calls(fn, repeat: int) -> float:
+    """Average seconds per call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark VectorIndex against DocArrayInMemorySearch")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--k", type=int, default=15)
+    args = parser.parse_args()
+
+    embeddings = DeterministicFakeEmbedding(size=args.dim)
+    print(f"{'tools':>8} {'index':>10} {'build (s)':>10} {'search (ms)':>12} {'search_many/query (ms)':>23}")
+    for size in SIZES:
+        texts = tool_texts(size)
+        metadatas = [{"name": f"apply_T{i}2U{i}_transformation_tool"} for i in range(size)]
+
+        start = time.perf_counter()
+        index = VectorIndex.from_texts(texts, embeddings, metadatas=metadatas)
+        build = time.perf_counter() - start
+        search = time_calls(lambda: index.search(QUERIES[0], k=args.k), args.repeat) * 1000
+        many = time_calls(lambda: index.search_many(QUERIES, k=args.k), args.repeat) * 1000 / len(QUERIES)
+        print(f"{size:>8} {'numpy':>10} {build:>10.3f} {search:>12.3f} {many:>23.3f}")
+
+        start = time.perf_counter()
+        docarray = DocArrayInMemorySearch.from_texts(texts, embeddings, metadatas=metadatas)
+        build = time.perf_counter() - start
+        search = time_calls(lambda: docarray.similarity_search(QUERIES[0], k=args.k), args.repeat) * 1000
+        print(f"{size:>8} {'docarray':>10} {build:>10.3f} {search:>12.3f} {'-':>23}")
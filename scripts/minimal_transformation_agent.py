@@ -19,6 +19,7 @@ from langgraph.prebuilt import ToolNode, tools_condition
 from langchain_mcp_adapters.tools import load_mcp_tools
 
 from src.mcp_ext.client import MCPClient
+from src.mcp_ext.batch import split_batch_tool
 
 load_dotenv()
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-5-nano-2025-08-07")
@@ -80,7 +81,9 @@ class ATLAgent:
         priority_tools = []
         other_tools = []
         
-        for tool in response.tools:
+        # batch_call_tool is plumbing, never a tool for the LLM
+        tools, _ = split_batch_tool(response.tools)
+        for tool in tools:
             # Always include extract tool
             if tool.name == "extract_input_metamodel_name":
                 priority_tools.insert(0, tool.name)
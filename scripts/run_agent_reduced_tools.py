@@ -12,7 +12,7 @@ from pathlib import Path
 import datetime
 from typing import List
 from dotenv import load_dotenv
-from scripts.run_agent_versions import populate_registry
+from scripts.run_agent_versions import populate_registry, close_agent
 from src.agents.workflow import WorkflowPlan
 # Load environment variables from .env file
 load_dotenv(Path(__file__).parent.parent / '.env')
@@ -175,7 +175,7 @@ if __name__ == "__main__":
                         invocation = MCPInvocation(
                             tool_name=step.tool_name,
                             server_name=step.server_name,
-                            arguments=step.parameters,
+                            arguments=step.serializable_parameters(),
                             result=result.get("result", {}),
                             success=result.get("success", False)
                         )
@@ -192,7 +192,7 @@ if __name__ == "__main__":
                             {
                                 "tool_name": step.tool_name,
                                 "server_name": step.server_name,
-                                "parameters": step.parameters
+                                "parameters": step.serializable_parameters()
                             } for step in plan.steps
                         ],
                         "execution_results": [],
@@ -277,18 +277,8 @@ if __name__ == "__main__":
             import traceback
             traceback.print_exc()
         finally:
-            try:
-                for server_name, cli in getattr(agent, 'executor', object()).mcp_clients.items():
-                    try:
-                        if hasattr(cli, 'exit_stack'):
-                            try:
-                                await cli.exit_stack.aclose()
-                            except BaseException:
-                                pass
-                    except BaseException:
-                        pass
-            except BaseException:
-                pass
+            if agent is not None:
+                await close_agent(agent)
             try:
                 await asyncio.sleep(0.2)
             except BaseException:
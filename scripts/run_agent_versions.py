@@ -7,10 +7,12 @@ import asyncio
 import json
 import subprocess
 import argparse
+import hashlib
+import time
 from pathlib import Path
 import datetime
 import importlib.util
-from typing import List
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 from src.agents.workflow import WorkflowPlan
 # Load environment variables from .env file
@@ -18,90 +20,107 @@ load_dotenv(Path(__file__).parent.parent / '.env')
 
 # Import project modules
 from mcp_servers.atl_server.atl_mcp_server import fetch_transformations
-from src.core.megamodel import MegamodelRegistry
+from src.core.megamodel import MegamodelRegistry, RegistryChange
+from src.core.config import config
 from src.core.am3 import ReferenceModel, TransformationModel
 from src.mcp_ext.integrator import MCPServerIntegrator
 from src.mcp_ext.client import MCPClient
+from src.mcp_ext.batch import split_batch_tool
 from src.agents.execution import MCPInvocation
 
-async def populate_registry(registry):
-    integrator = MCPServerIntegrator(registry)
-    
+DEFAULT_SNAPSHOT_PATH = Path(__file__).parent.parent / ".cache" / "megamodel.snapshot"
+# Bump when discovery changes what it records, so snapshots of older discoveries are not reused
+DISCOVERY_FORMAT = 2
 
-    # Get server script paths
-    atl_server_script = os.path.join(os.path.dirname(__file__), '..', 'mcp_servers', 'atl_server', 'atl_mcp_server.py')
-    emf_server_script = os.path.join(os.path.dirname(__file__), '..', 'mcp_servers', 'emf_server', 'stateless_emf_server.py')
-    openrewrite_server_script = os.path.join(os.path.dirname(__file__), '..', 'mcp_servers', 'openRewrite_servers', 'openrewrite_server.py')
 
-    # Setup servers with script paths in metadata
-    atl_server = integrator.setup_atl_server()
-    emf_server = integrator.setup_emf_server()
-    # For OpenRewrite, add a generic server registration if needed
+def fetch_transformation_samples() -> dict:
+    """Fetch sample source paths from the ATL server, keyed by transformation name."""
+    try:
+        samples_raw = subprocess.run([
+            'curl', '-s', '-X', 'GET', 'http://localhost:8080/transformations/samples'
+        ], capture_output=True, text=True, check=True)
+        samples_data = json.loads(samples_raw.stdout)
+        # Map name -> sampleSources
+        return {entry.get('name'): entry.get('sampleSources', []) for entry in (samples_data or [])}
+    except Exception:
+        return {}
 
-    # Setup OpenRewrite server (mimic ATL/EMF pattern)
-    from src.mcp_ext.infrastructure import MCPServer, MCPCapability
-    openrewrite_server = MCPServer(
-        host="localhost",
-        port=8089,
-        name="openrewrite_server",
-        tools_port=8083
-    )
-    openrewrite_server.add_capability(MCPCapability(
-        input_types=["java", "xml", "yml", "properties"],
-        output_types=["java", "xml", "yml", "properties"],
-        can_execute=True,
-        description="OpenRewrite code transformations"
-    ))
-    integrator.registry.register_mcp_server("openrewrite_server", openrewrite_server)
-    openrewrite_server.metadata["script_path"] = openrewrite_server_script
-    atl_server.metadata["script_path"] = atl_server_script
-    emf_server.metadata["script_path"] = emf_server_script
 
-    # Get ATL tools
-    atl_client = MCPClient()
-    tools = []
+def _file_digest(path: str) -> str:
     try:
-        await atl_client.connect_to_server(atl_server_script)
-        session = await atl_client.get_session()
-        response = await session.list_tools()
-        tools = response.tools
-    finally:
-        await atl_client.cleanup()
-    atl_tools = tools
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return ""
 
-    # Discover EMF tools using MCP protocol
-    emf_client = MCPClient()
-    tools = []
-    try:
-        await emf_client.connect_to_server(emf_server_script)
-        session = await emf_client.get_session()
-        response = await session.list_tools()
-        tools = response.tools
-    finally:
-        await emf_client.cleanup()
-    emf_tools = tools
 
-    # Discover OpenRewrite tools using MCP protocol
-    openrewrite_client = MCPClient()
+async def discover_server_tools(server_script: str) -> list:
+    """Spawn an MCP server once and return its list_tools result."""
+    client = MCPClient()
     tools = []
     try:
-        await openrewrite_client.connect_to_server(openrewrite_server_script)
-        session = await openrewrite_client.get_session()
+        # The list_tools call below is the only one needed; skip the announcing one
+        await client.connect_to_server(server_script, announce_tools=False)
+        session = await client.get_session()
         response = await session.list_tools()
         tools = response.tools
     finally:
-        await openrewrite_client.cleanup()
-    openrewrite_tools = tools
+        await client.cleanup()
+    return tools
 
-    # Register tools with the megamodel registry
-    registry.tools_by_server["atl_server"] = atl_tools
-    registry.tools_by_server["emf_server"] = emf_tools
-    registry.tools_by_server["openrewrite_server"] = openrewrite_tools
 
-    # Call ATL server to get enabled transformations
-    enabled_transformations = fetch_transformations()
+async def discover_all_server_tools(server_scripts: Dict[str, str], timeout: Optional[float] = None) -> Dict[str, dict]:
+    """Discover the tools of several MCP servers concurrently.
 
-    # Register transformation tools for ATL server
+    Each server gets its own deadline (config.default_timeout by default). A
+    server that fails or times out yields an empty tool list and an error in
+    its report entry instead of holding up the others. batch_call_tool is
+    left out of the tools and reported as "supports_batch". Returns
+    {server_name: {"tools": [...], "supports_batch": bool, "seconds": float, "error": str}}.
+    """
+    timeout = config.default_timeout if timeout is None else timeout
+
+    async def discover(server_name: str, server_script: str) -> dict:
+        start = time.perf_counter()
+        tools, supports_batch, error = [], False, ""
+        try:
+            tools = await asyncio.wait_for(discover_server_tools(server_script), timeout=timeout)
+            tools, supports_batch = split_batch_tool(tools)
+        except asyncio.TimeoutError:
+            error = f"timed out after {timeout}s"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        seconds = time.perf_counter() - start
+        if error:
+            print(f"Tool discovery failed for {server_name} ({seconds:.2f}s): {error}")
+        else:
+            print(f"Discovered {len(tools)} tools on {server_name} in {seconds:.2f}s")
+        return {"tools": tools, "supports_batch": supports_batch, "seconds": seconds, "error": error}
+
+    names = list(server_scripts)
+    reports = await asyncio.gather(*(discover(name, server_scripts[name]) for name in names))
+    return dict(zip(names, reports))
+
+
+async def fetch_atl_sources() -> tuple:
+    """Fetch the ATL enabled transformations and samples concurrently."""
+    return await asyncio.gather(
+        asyncio.to_thread(fetch_transformations),
+        asyncio.to_thread(fetch_transformation_samples),
+    )
+
+
+def _record_discovery(registry, reports: Dict[str, dict]) -> None:
+    for server_name, report in reports.items():
+        registry.set_server_tools(server_name, report["tools"])
+        server = registry.get_mcp_server(server_name)
+        if server is not None and hasattr(server, 'metadata'):
+            server.metadata["discovery"] = {"seconds": report["seconds"], "error": report["error"]}
+            server.metadata["supports_batch"] = report["supports_batch"]
+
+
+def build_transformation_entities(registry, enabled_transformations: list, samples_by_name: dict) -> List[TransformationModel]:
+    """Create TransformationModel entities for the ATL transformations, registering their metamodels."""
     def get_or_register_metamodel(uri, name):
         mm = registry.get_entity(uri)
         if not mm:
@@ -109,16 +128,7 @@ async def populate_registry(registry):
             registry.register_entity(mm)
         return mm
 
-    # Fetch samples once from ATL server
-    try:
-        samples_raw = subprocess.run([
-            'curl', '-s', '-X', 'GET', 'http://localhost:8080/transformations/samples'
-        ], capture_output=True, text=True, check=True)
-        samples_data = json.loads(samples_raw.stdout)
-        # Map name -> sampleSources
-        samples_by_name = {entry.get('name'): entry.get('sampleSources', []) for entry in (samples_data or [])}
-    except Exception:
-        samples_by_name = {}
+    entities = []
     for transfo_data in enabled_transformations:
         transfo_name = transfo_data.get('name')
         # Input metamodels
@@ -133,16 +143,166 @@ async def populate_registry(registry):
         if output_mms:
             mm = output_mms[0]
             target_ref = get_or_register_metamodel(mm.get('path'), mm.get('name', mm.get('path')))
-        # Register transformation with references
-        transfo_entity = TransformationModel(
+        # Transformation with references
+        entities.append(TransformationModel(
             uri=transfo_data.get('atlFile', transfo_data.get('name', 'unknown')),
             name=transfo_data.get('name', 'unknown'),
             source_metamodel=source_ref,
             target_metamodel=target_ref,
             sample_sources=samples_by_name.get(transfo_name, [])
-        )
+        ))
+    return entities
+
+
+def _registry_fingerprint(registry, enabled_transformations: list, samples_by_name: dict, server_scripts: List[str]) -> str:
+    return registry.compute_fingerprint(
+        enabled_transformations,
+        samples_by_name,
+        [_file_digest(p) for p in server_scripts],
+        DISCOVERY_FORMAT,
+    )
+
+
+def _save_registry_snapshot(registry, snapshot_path: str, fingerprint: str) -> None:
+    try:
+        registry.save_snapshot(snapshot_path, fingerprint)
+    except Exception as e:
+        print(f"Could not save megamodel snapshot to {snapshot_path}: {e}")
+
+
+async def populate_registry(registry, snapshot_path: Optional[str] = None, use_snapshot: bool = True,
+                            discovery_timeout: Optional[float] = None):
+    """Populate the registry with servers, tools and ATL transformations.
+
+    The MCP servers are discovered concurrently, each with its own timeout;
+    per-server discovery time and errors are stored in the server metadata
+    under "discovery". The result is cached in a megamodel snapshot
+    fingerprinted by the ATL backend's enabled transformations and samples
+    and by the server scripts; while that fingerprint is unchanged the
+    snapshot is loaded instead of spawning the MCP servers.
+    """
+    integrator = MCPServerIntegrator(registry)
+    
+
+    # Get server script paths
+    atl_server_script = os.path.join(os.path.dirname(__file__), '..', 'mcp_servers', 'atl_server', 'atl_mcp_server.py')
+    emf_server_script = os.path.join(os.path.dirname(__file__), '..', 'mcp_servers', 'emf_server', 'stateless_emf_server.py')
+    openrewrite_server_script = os.path.join(os.path.dirname(__file__), '..', 'mcp_servers', 'openRewrite_servers', 'openrewrite_server.py')
+
+    # Call ATL server to get enabled transformations and fetch samples once
+    enabled_transformations, samples_by_name = await fetch_atl_sources()
+
+    snapshot_path = str(snapshot_path or config.megamodel_snapshot_path or DEFAULT_SNAPSHOT_PATH)
+    fingerprint = _registry_fingerprint(
+        registry, enabled_transformations, samples_by_name,
+        [atl_server_script, emf_server_script, openrewrite_server_script],
+    )
+    if use_snapshot and registry.load_snapshot(snapshot_path, fingerprint):
+        print(f"Loaded megamodel snapshot from {snapshot_path}")
+        return
+
+    # Setup servers with script paths in metadata
+    atl_server = integrator.setup_atl_server()
+    emf_server = integrator.setup_emf_server()
+    # For OpenRewrite, add a generic server registration if needed
+
+    # Setup OpenRewrite server (mimic ATL/EMF pattern)
+    from src.mcp_ext.infrastructure import MCPServer, MCPCapability
+    openrewrite_server = MCPServer(
+        host="localhost",
+        port=8089,
+        name="openrewrite_server",
+        tools_port=8083
+    )
+    openrewrite_server.add_capability(MCPCapability(
+        input_types=["java", "xml", "yml", "properties"],
+        output_types=["java", "xml", "yml", "properties"],
+        can_execute=True,
+        description="OpenRewrite code transformations"
+    ))
+    integrator.registry.register_mcp_server("openrewrite_server", openrewrite_server)
+    openrewrite_server.metadata["script_path"] = openrewrite_server_script
+    atl_server.metadata["script_path"] = atl_server_script
+    emf_server.metadata["script_path"] = emf_server_script
+
+    # Discover ATL, EMF and OpenRewrite tools concurrently using MCP protocol
+    reports = await discover_all_server_tools({
+        "atl_server": atl_server_script,
+        "emf_server": emf_server_script,
+        "openrewrite_server": openrewrite_server_script,
+    }, timeout=discovery_timeout)
+
+    # Register tools with the megamodel registry
+    _record_discovery(registry, reports)
+
+    # Register transformation tools for ATL server
+    for transfo_entity in build_transformation_entities(registry, enabled_transformations, samples_by_name):
         registry.register_entity(transfo_entity)
 
+    # A degraded discovery must not be cached as if it were complete
+    if use_snapshot and not any(report["error"] for report in reports.values()):
+        _save_registry_snapshot(registry, snapshot_path, fingerprint)
+
+
+async def refresh_registry(registry, snapshot_path: Optional[str] = None, use_snapshot: bool = True,
+                           discovery_timeout: Optional[float] = None) -> List[RegistryChange]:
+    """Bring an already populated registry up to date, applying only the differences.
+
+    Re-lists the tools of every registered server that has a script path and
+    re-reads the ATL enabled transformations, then adds, removes or updates
+    only the tools and transformations that changed. A server whose discovery
+    fails keeps its current tools. Subscribers of the registry receive one
+    change event per difference; the same changes are returned.
+    """
+    changes: List[RegistryChange] = []
+    server_scripts = {}
+    for server_name, server in list(registry.mcp_servers.items()):
+        server_script = getattr(server, 'metadata', {}).get('script_path')
+        if server_script:
+            server_scripts[server_name] = server_script
+
+    reports, (enabled_transformations, samples_by_name) = await asyncio.gather(
+        discover_all_server_tools(server_scripts, timeout=discovery_timeout),
+        fetch_atl_sources(),
+    )
+    for server_name, report in reports.items():
+        if report["error"]:
+            print(f"Skipping tool refresh for {server_name}: {report['error']}")
+            continue
+        changes.extend(registry.set_server_tools(server_name, report["tools"]))
+        server = registry.get_mcp_server(server_name)
+        if server is not None and hasattr(server, 'metadata'):
+            server.metadata["supports_batch"] = report["supports_batch"]
+
+    transformations = build_transformation_entities(registry, enabled_transformations, samples_by_name)
+    changes.extend(registry.sync_entities(transformations, TransformationModel))
+
+    if use_snapshot and changes and not any(report["error"] for report in reports.values()):
+        snapshot_path = str(snapshot_path or config.megamodel_snapshot_path or DEFAULT_SNAPSHOT_PATH)
+        fingerprint = _registry_fingerprint(registry, enabled_transformations, samples_by_name,
+                                            list(server_scripts.values()))
+        _save_registry_snapshot(registry, snapshot_path, fingerprint)
+    return changes
+
+
+async def close_agent(agent) -> None:
+    """Close an agent whose MCP sessions were opened on the running loop.
+
+    The sessions are closed here, on the loop that owns them, before the
+    agent's own close() (or, for agent versions without one, the executor's
+    shutdown()) stops its runtime and drops its registry subscription.
+    Errors and cancellations are swallowed so one agent cannot abort a run.
+    """
+    try:
+        await agent.executor.cleanup_mcp_clients()
+    except BaseException as e:
+        print(f"Error closing MCP sessions: {e}")
+    try:
+        close = getattr(agent, "close", None) or agent.executor.shutdown
+        close()
+    except BaseException as e:
+        print(f"Error closing agent: {e}")
+
 
 def load_agent_class_from_file(file_path: Path):
     """Dynamically load MCPAgent class from a given Python file path.
@@ -273,9 +433,10 @@ if __name__ == "__main__":
                                     invocation = MCPInvocation(
                                         tool_name=step.tool_name,
                                         server_name=step.server_name,
-                                        arguments=step.parameters,
+                                        arguments=step.serializable_parameters(),
                                         result=result.get("result", {}),
-                                        success=result.get("success", False)
+                                        success=result.get("success", False),
+                                        duration=result.get("duration")
                                     )
                                     trace.add_invocation(invocation)
                                 # Mark plan as completed after execution
@@ -290,7 +451,7 @@ if __name__ == "__main__":
                                         {
                                             "tool_name": step.tool_name,
                                             "server_name": step.server_name,
-                                            "parameters": step.parameters
+                                            "parameters": step.serializable_parameters()
                                         } for step in plan.steps
                                     ],
                                     "execution_results": [],
@@ -374,20 +535,9 @@ if __name__ == "__main__":
                         import traceback
                         traceback.print_exc()
                     finally:
-                        # Cleanup per-agent clients
-                        try:
-                            for server_name, cli in getattr(agent, 'executor', object()).mcp_clients.items():
-                                try:
-                                    if hasattr(cli, 'exit_stack'):
-                                        try:
-                                            await cli.exit_stack.aclose()
-                                        except BaseException:
-                                            # Swallow cancellation/errors on shutdown to avoid aborting the whole run
-                                            pass
-                                except BaseException:
-                                    pass
-                        except BaseException:
-                            pass
+                        # Release the agent's sessions, pooled servers, runtime thread and registry subscription
+                        if agent is not None:
+                            await close_agent(agent)
                         # Small delay to allow subprocess cleanup before next agent
                         try:
                             await asyncio.sleep(0.2)
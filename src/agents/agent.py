@@ -1,11 +1,17 @@
 import os
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_community.vectorstores import DocArrayInMemorySearch
-from src.core.megamodel import MegamodelRegistry
+from src.agents.embedding_cache import CachedEmbeddings
+from src.agents.keyword_index import KeywordIndex
+from src.agents.retrieval_cache import RetrievalCache
+from src.agents.vector_index import VectorIndex
+from src.core.am3 import Model
+from src.core.config import config
+from src.core.megamodel import MegamodelRegistry, RegistryChange, ChangeKind
 from src.agents.workflow import WorkflowExecutor
 from src.agents.planning import WorkflowPlan, PlanStep, AgentGoal
 import json
+from typing import Any, Dict, Optional
 
 load_dotenv()
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
@@ -13,7 +19,7 @@ OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-s
 
 class MCPAgent:
     """Agent powered by an LLM (OpenAI) for MDE orchestration"""
-    def __init__(self, registry: MegamodelRegistry):
+    def __init__(self, registry: MegamodelRegistry, offline: Optional[bool] = None):
         self.registry = registry
         self.executor = WorkflowExecutor(registry)
         # Initialize OpenAI chat model (configure OPENAI_API_KEY in environment)
@@ -23,100 +29,194 @@ class MCPAgent:
             temperature=0.1,
             max_retries=2
         )
-        # Embeddings and vector stores for RAG
-        self.embeddings = OpenAIEmbeddings(model=OPENAI_EMBEDDING_MODEL)
+        # Embeddings and vector stores for RAG; offline, retrieval uses only the keyword indexes
+        self.offline = config.rag_offline if offline is None else offline
+        self.embeddings = None if self.offline else CachedEmbeddings(OpenAIEmbeddings(model=OPENAI_EMBEDDING_MODEL), OPENAI_EMBEDDING_MODEL)
         self.tool_index = None
         self.model_index = None
+        self.tool_keywords = KeywordIndex()
+        self.model_keywords = KeywordIndex()
         self.tool_registry = {}
+        # Registry changes since the indexes were last synced, keyed by (category, server, key)
+        self._pending_changes: Dict[tuple, RegistryChange] = {}
+        self._indexes_stale = False
+        self.indexed_registry_version = -1  # Registry version the indexes reflect
+        self.index_version = 0  # Grows whenever the content of either index changes
+        self.registry.subscribe(self._on_registry_change)
+        self.retrieval_cache = RetrievalCache()
+
+    @staticmethod
+    def _tool_entry(tool, server_name: str = ""):
+        """(id, text, metadata, (name, description)) of a tool in the tool indexes"""
+        name = getattr(tool, "name", "")
+        desc = getattr(tool, "description", "")
+        server = getattr(tool, "server_name", "") or server_name
+        text = f"tool name: {name}\nserver: {server}\ndescription: {desc}"
+        return f"{server}/{name}", text, {"name": name, "server": server}, (name, desc)
+
+    @staticmethod
+    def _model_entry(model):
+        """(id, text, metadata, (name, description)) of a model in the model indexes"""
+        name = getattr(model, "name", "")
+        uri = getattr(model, "uri", "")
+        text = f"model name: {name}\nuri: {uri}"
+        return uri, text, {"name": name, "uri": uri}, (name, uri)
+
+    def _upsert(self, index, entries, removed=()):
+        """Apply removals and entry upserts to a vector index, creating it if needed"""
+        if index is None:
+            index = VectorIndex(self.embeddings)
+        index.remove(removed)
+        if entries:
+            ids, texts, metas, _ = zip(*entries)
+            index.add_texts(texts, metadatas=metas, ids=ids)
+        return index
+
+    def _update_indexes(self, tool_entries, model_entries, tool_removed=(), model_removed=(), rebuild=False):
+        """Apply changes to the keyword indexes and, unless offline, to the vector indexes"""
+        if rebuild:
+            self.tool_keywords.clear()
+            self.model_keywords.clear()
+        for keywords, entries, removed in ((self.tool_keywords, tool_entries, tool_removed),
+                                           (self.model_keywords, model_entries, model_removed)):
+            keywords.remove(removed)
+            for id, _, metadata, (name, description) in entries:
+                keywords.add(id, name, description, metadata)
+        if self.offline:
+            return
+        self.tool_index = self._upsert(None if rebuild else self.tool_index, tool_entries, tool_removed)
+        self.model_index = self._upsert(None if rebuild else self.model_index, model_entries, model_removed)
 
     def _build_indexes(self):
-        """Build in-memory vector indexes for tools and models from the registry."""
-        # Tools index
-        all_tools = self.registry.discover_tools()
-        tool_texts = []
-        tool_metas = []
-        for t in all_tools:
-            name = getattr(t, "name", "")
-            desc = getattr(t, "description", "")
-            server = getattr(t, "server_name", "")
-            text = f"tool name: {name}\nserver: {server}\ndescription: {desc}"
-            tool_texts.append(text)
-            tool_metas.append({"name": name, "server": server})
-        if tool_texts:
-            self.tool_index = DocArrayInMemorySearch.from_texts(tool_texts, self.embeddings, metadatas=tool_metas)
-        else:
-            self.tool_index = None
-
-        # Models index
-        all_models = self.registry.find_entities_by_type(self.registry.entities.get("Model", type(None)))
-        model_texts = []
-        model_metas = []
-        for m in all_models:
-            name = getattr(m, "name", "")
-            uri = getattr(m, "uri", "")
-            text = f"model name: {name}\nuri: {uri}"
-            model_texts.append(text)
-            model_metas.append({"name": name, "uri": uri})
-        if model_texts:
-            self.model_index = DocArrayInMemorySearch.from_texts(model_texts, self.embeddings, metadatas=model_metas)
-        else:
-            self.model_index = None
+        """Build in-memory vector and keyword indexes for tools and models from the registry."""
+        synced_version = self.registry.version
+        self._pending_changes.clear()
+        tool_entries = [self._tool_entry(t, server) for server, tools in self.registry.tools_by_server.items() for t in tools]
+        model_entries = [self._model_entry(m) for m in self.registry.find_entities_by_type(Model)]
+        self._update_indexes(tool_entries, model_entries, rebuild=True)
+        self._indexes_stale = False
+        self.indexed_registry_version = synced_version
+        self.index_version += 1
+
+    def _on_registry_change(self, change: RegistryChange):
+        """Queue a registry mutation; the indexes catch up on the next retrieval"""
+        if change.kind == ChangeKind.RESET:
+            self._indexes_stale = True
+            self._pending_changes.clear()
+        elif change.category in ("tool", "entity"):
+            # Only the last change of a key matters
+            self._pending_changes[(change.category, change.server_name, change.key)] = change
+
+    def _apply_pending_changes(self):
+        """Upsert or delete only the entries of tools and models that changed"""
+        synced_version = self.registry.version
+        changes = list(self._pending_changes.values())
+        self._pending_changes.clear()
+        tool_entries, tool_removed, model_entries, model_removed = [], [], [], []
+        for change in changes:
+            if change.category == "tool":
+                if change.kind == ChangeKind.REMOVED:
+                    tool_removed.append(f"{change.server_name}/{change.key}")
+                else:
+                    tool_entries.append(self._tool_entry(change.item, change.server_name))
+            elif change.kind == ChangeKind.REMOVED or not isinstance(change.item, Model):
+                model_removed.append(change.key)
+            else:
+                model_entries.append(self._model_entry(change.item))
+        try:
+            self._update_indexes(tool_entries, model_entries, tool_removed, model_removed)
+        except Exception:
+            self._indexes_stale = True
+            raise
+        self.indexed_registry_version = synced_version
+        if changes:
+            self.index_version += 1
+
+    def _sync_indexes(self):
+        """Build the indexes once, then keep them in step with registry changes"""
+        if self._indexes_stale or self.indexed_registry_version < 0:
+            self._build_indexes()
+        elif self._pending_changes or self.indexed_registry_version != self.registry.version:
+            self._apply_pending_changes()
+
+    @property
+    def indexes_fresh(self) -> bool:
+        """Whether the indexes reflect the current registry version"""
+        return (not self._indexes_stale and not self._pending_changes
+                and self.indexed_registry_version == self.registry.version)
 
     def _retrieve_relevant(self, query: str, k_tools: int = 15, k_models: int = 10):
-        """Retrieve relevant tools and models via vector search; fallback to keyword heuristics."""
-        # Ensure indexes are built
-        if self.tool_index is None or self.model_index is None:
-            try:
-                self._build_indexes()
-            except Exception as e:
-                print(f"RAG index build failed, will fallback to keyword matching: {e}")
+        """Retrieve relevant tools and models via vector search; fallback to BM25 keyword ranking."""
+        # Ensure indexes are built and up to date
+        try:
+            self._sync_indexes()
+        except Exception as e:
+            print(f"RAG index build failed, will fallback to keyword ranking: {e}")
 
         # Base data from registry
         all_tools = self.registry.discover_tools()
         tools_by_name = {getattr(t, "name", ""): t for t in all_tools}
-        all_models = self.registry.find_entities_by_type(self.registry.entities.get("Model", type(None)))
+        all_models = self.registry.find_entities_by_type(Model)
         models_by_name = {getattr(m, "name", ""): m for m in all_models}
 
+        # Near-identical queries reuse what was retrieved for the current indexes
+        cache_key = self.retrieval_cache.make_key(query, k_tools, k_models)
+        cached = self.retrieval_cache.get(cache_key, self.index_version)
+        if cached is not None:
+            return cached
+
         relevant_tools = []
         relevant_models = []
+        retrieval_failed = False
         try:
-            if self.tool_index is not None:
-                docs = self.tool_index.similarity_search(query, k=k_tools)
+            query_vector = None
+            if not self.offline and (self.tool_index or self.model_index):
+                # One query embedding serves both indexes
+                query_vector = self.embeddings.embed_query(query)
+            if self.tool_index:
+                docs = self.tool_index.search_by_vector(query_vector, k=k_tools)
                 for d in docs:
                     name = d.metadata.get("name")
                     if name in tools_by_name:
                         relevant_tools.append(tools_by_name[name])
-            if self.model_index is not None:
-                mdocs = self.model_index.similarity_search(query, k=k_models)
+            if self.model_index:
+                mdocs = self.model_index.search_by_vector(query_vector, k=k_models)
                 for d in mdocs:
                     name = d.metadata.get("name")
                     if name in models_by_name:
                         relevant_models.append(models_by_name[name])
         except Exception as e:
-            print(f"RAG retrieval failed, falling back to keyword matching: {e}")
+            print(f"RAG retrieval failed, falling back to keyword ranking: {e}")
+            retrieval_failed = True
 
-        # Fallback to simple keyword method if empty
+        # Offline, or if vector search found nothing, rank by BM25 over the keyword indexes
         if not relevant_tools:
-            keywords = [w.lower() for w in query.split()]
-            def clean_token(tok: str) -> str:
-                return tok.strip("'\".,:;!?()[]{}")
-            norm_keywords = [clean_token(k) for k in keywords]
-            for tool in all_tools:
-                name = getattr(tool, "name", str(tool)).lower()
-                desc = getattr(tool, "description", "").lower()
-                if any(k and (k in name or k in desc) for k in norm_keywords):
-                    relevant_tools.append(tool)
+            for hit in self.tool_keywords.search(query, k=k_tools):
+                name = hit.metadata.get("name")
+                if name in tools_by_name:
+                    relevant_tools.append(tools_by_name[name])
             if not relevant_tools:
                 relevant_tools = all_tools[:5]
         if not relevant_models:
-            for model in all_models:
-                name = getattr(model, "name", str(model)).lower()
-                if any(k in name for k in [w.lower() for w in query.split()]):
-                    relevant_models.append(model)
+            for hit in self.model_keywords.search(query, k=k_models):
+                name = hit.metadata.get("name")
+                if name in models_by_name:
+                    relevant_models.append(models_by_name[name])
             if not relevant_models:
                 relevant_models = all_models[:5]
+        if not retrieval_failed and self.indexes_fresh:
+            self.retrieval_cache.put(cache_key, self.index_version, relevant_tools, relevant_models)
         return relevant_tools, relevant_models
 
+    def retrieval_stats(self) -> Dict[str, Any]:
+        """Hit rates of the retrieval and embedding caches"""
+        return {
+            "retrieval_cache": self.retrieval_cache.stats(),
+            "embedding_cache": self.embeddings.cache.stats() if self.embeddings else {},
+            "embedding_calls": self.embeddings.embedding_calls if self.embeddings else 0,
+            "index_version": self.index_version,
+        }
+
     def plan_workflow(self, user_goal: str) -> WorkflowPlan:
         """Use LLM to reason and generate a workflow plan for the user goal (filtered context)"""
         goal = AgentGoal(
@@ -137,11 +237,13 @@ class MCPAgent:
             f"Relevant tools: {tool_names}\n"
             f"Relevant models: {model_names}\n"
             f"Available server names: {available_servers}\n"
-            "Generate a workflow plan as a JSON list of steps. Each step must be a JSON object with keys: tool_name, server_name, parameters, description.\n"
+            "Generate a workflow plan as a JSON list of steps. Each step must be a JSON object with keys: step_id, tool_name, server_name, parameters, description.\n"
             "Rules: (1) Use list_transformation_*_tool for info-only queries (parameters can be {}).\n"
-            "(2) If you choose an apply_*_transformation_tool, you MUST include parameters.file_path with the absolute path to the input .xmi file (the executor attaches it as multipart field IN). Without file_path, the call fails.\n"
-            "(3) Use only the file path that appears in the user goal; do not invent paths.\n"
-            "Output ONLY the JSON list, no extra text. Example: [{\"tool_name\": ..., \"server_name\": ..., \"parameters\": {...}, \"description\": ...}]"
+            "(2) An apply_*_transformation_tool takes its input model in exactly one of two ways: parameters.file_path, the absolute path to the input .xmi file (the executor attaches it as multipart field IN), "
+            "or parameters.model_content set to \"$ref:<step_id>.model\", the model produced by an earlier apply step of this plan. Without one of them, the call fails.\n"
+            "(3) Use only the file path that appears in the user goal; do not invent paths. To chain transformations, give the first step the file_path and every later step model_content referencing the step before it.\n"
+            "Output ONLY the JSON list, no extra text. Example: [{\"step_id\": \"s1\", \"tool_name\": ..., \"server_name\": ..., \"parameters\": {\"file_path\": ...}, \"description\": ...}, "
+            "{\"step_id\": \"s2\", \"tool_name\": ..., \"server_name\": ..., \"parameters\": {\"model_content\": \"$ref:s1.model\"}, \"description\": ...}]"
         )
         print("\n--- LLM Prompt ---")
         print(prompt)
@@ -184,7 +286,7 @@ class MCPAgent:
         tool_index = {getattr(t, "name", ""): t for t in all_tools}
         available_servers = list(self.registry.tools_by_server.keys())
         
-        for step in steps:
+        for position, step in enumerate(steps):
             if isinstance(step, dict):
                 tool_name = step.get("tool_name")
                 server_name = step.get("server_name")
@@ -194,16 +296,28 @@ class MCPAgent:
                     else:
                         server_name = available_servers[0] if available_servers else ""
                 parameters = step.get("parameters", {}) or {}
-                plan.add_step(PlanStep(
-                    tool_name=tool_name,
-                    server_name=server_name,
-                    parameters=parameters,
-                    description=step.get("description", "")
-                ))
+                # Steps without an id are named by their position, so "$ref:<index>" keeps
+                # pointing at the same step even if an earlier one is dropped
+                step_id = str(step.get("step_id", "") or position)
+                try:
+                    plan.add_step(PlanStep(
+                        tool_name=tool_name,
+                        server_name=server_name,
+                        parameters=parameters,
+                        step_id=step_id,
+                        description=step.get("description", "")
+                    ))
+                except ValueError as e:
+                    print(f"Skipping step {step_id} ({tool_name}): {e}")
         return plan
 
     def run(self, user_goal: str):
         """End-to-end agent orchestration: plan and execute workflow"""
         plan = self.plan_workflow(user_goal)
         result = self.executor.execute_workflow(plan)
-        return result
\ No newline at end of file
+        return result
+
+    def close(self):
+        """Close the executor's MCP sessions and background loop"""
+        self.registry.unsubscribe(self._on_registry_change)
+        self.executor.shutdown()
\ No newline at end of file
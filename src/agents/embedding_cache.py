@@ -0,0 +1,325 @@
+"""
+Embedding Cache - Disk-backed, content-addressed cache of text embeddings
+"""
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.core.config import config
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent.parent / ".cache" / "embeddings"
+_INITIAL_ROWS = 1024
+_MATRIX_FILE = "vectors.f32"
+_INDEX_FILE = "index.json"
+_JOURNAL_FILE = "journal.jsonl"
+_MIN_JOURNAL_COMPACTION = 1024
+
+
+def text_key(text: str, kind: str = "document") -> str:
+    """Content address of a text (queries and documents may embed differently)"""
+    return hashlib.sha256(f"{kind}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Embeddings of one embedding model, keyed by the SHA-256 of the text.
+
+    Vectors are rows of a memory-mapped float32 matrix (vectors.f32); the
+    index (index.json) maps text hashes to rows in least- to most-recently
+    used order. Inserts only append [hash, row] lines to a journal
+    (journal.jsonl), replayed on load; flush(), process exit and a journal
+    longer than the index rewrite index.json and empty the journal. Beyond
+    max_entries the least recently used rows are reused.
+    Each model gets its own directory, so vectors of different models (or
+    dimensions) never mix. Writes assume one writing process at a time.
+    """
+
+    def __init__(self, model_name: str, directory: Optional[str] = None, max_entries: Optional[int] = None):
+        self.model_name = model_name
+        root = Path(directory or config.embedding_cache_path or DEFAULT_CACHE_DIR)
+        self.directory = root / re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        self.max_entries = config.embedding_cache_size if max_entries is None else max_entries
+        self.dim: Optional[int] = None
+        self._matrix: Optional[np.memmap] = None
+        self._capacity = 0
+        self._next_row = 0
+        self._rows: OrderedDict = OrderedDict()  # text hash -> row, least recently used first
+        self._free: List[int] = []
+        self._lock = threading.Lock()
+        self._journal_lines = 0
+        self._dirty = False  # Recency changes not yet in index.json
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.enabled:
+            self._load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @property
+    def _matrix_path(self) -> Path:
+        return self.directory / _MATRIX_FILE
+
+    @property
+    def _index_path(self) -> Path:
+        return self.directory / _INDEX_FILE
+
+    @property
+    def _journal_path(self) -> Path:
+        return self.directory / _JOURNAL_FILE
+
+    def _load(self):
+        if not self._index_path.is_file() or not self._matrix_path.is_file():
+            return
+        try:
+            with open(self._index_path) as f:
+                index = json.load(f)
+            dim, capacity = int(index["dim"]), int(index["capacity"])
+            if self._matrix_path.stat().st_size != dim * capacity * 4:
+                raise ValueError("matrix file does not match the index")
+            self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+            self.dim, self._capacity = dim, capacity
+            self._rows = OrderedDict((key, int(row)) for key, row in index["entries"])
+            self._replay_journal()
+        except Exception as e:
+            print(f"Ignoring unreadable embedding cache in {self.directory}: {e}")
+            self._reset()
+            return
+        self._next_row = max(self._rows.values(), default=-1) + 1
+        while len(self._rows) > self.max_entries:
+            self._free.append(self._rows.popitem(last=False)[1])
+
+    def _replay_journal(self):
+        """Apply the inserts made since index.json was written"""
+        if not self._journal_path.is_file():
+            return
+        owners = {row: key for key, row in self._rows.items()}
+        with open(self._journal_path) as f:
+            for line in f:
+                try:
+                    key, row = json.loads(line)
+                except ValueError:
+                    # Torn last line of an interrupted write: later appends must not follow it
+                    self._save_index()
+                    return
+                row = int(row)
+                if row >= self._capacity:
+                    raise ValueError("journal row outside the matrix")
+                previous = owners.get(row)
+                if previous is not None and previous != key:
+                    del self._rows[previous]
+                self._rows.pop(key, None)
+                self._rows[key] = row
+                owners[row] = key
+                self._journal_lines += 1
+        self._dirty = self._journal_lines > 0
+
+    def _reset(self):
+        self._matrix = None
+        self.dim = None
+        self._capacity = 0
+        self._next_row = 0
+        self._rows = OrderedDict()
+        self._free = []
+        self._journal_lines = 0
+        self._dirty = False
+
+    def _grow(self):
+        """Double the matrix (up to max_entries rows), keeping its contents"""
+        capacity = min(self.max_entries, max(_INITIAL_ROWS, self._capacity * 2))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        with open(self._matrix_path, "ab") as f:
+            f.truncate(capacity * self.dim * 4)
+        self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self._capacity = capacity
+        # index.json records the matrix shape, so it must follow every resize
+        self._save_index()
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        if self._next_row < self.max_entries:
+            if self._next_row >= self._capacity:
+                self._grow()
+            self._next_row += 1
+            return self._next_row - 1
+        self.evictions += 1
+        return self._rows.popitem(last=False)[1]
+
+    def _save_index(self):
+        index = {
+            "model": self.model_name,
+            "dim": self.dim,
+            "capacity": self._capacity,
+            "entries": list(self._rows.items()),
+        }
+        tmp = self._index_path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(index, f, separators=(",", ":"))
+        os.replace(tmp, self._index_path)
+        self._journal_path.unlink(missing_ok=True)
+        self._journal_lines = 0
+        self._dirty = False
+
+    def _append_journal(self, entries: List[Tuple[str, int]]):
+        with open(self._journal_path, "a") as f:
+            f.write("".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries))
+        self._journal_lines += len(entries)
+        self._dirty = True
+        # Keep replay (and the journal file) no larger than the index itself
+        if self._journal_lines > max(_MIN_JOURNAL_COMPACTION, len(self._rows)):
+            self._save_index()
+
+    def get_many(self, texts: Sequence[str], kind: str = "document") -> List[Optional[np.ndarray]]:
+        """Cached vectors of texts, None for each miss"""
+        if not self.enabled:
+            self.misses += len(texts)
+            return [None] * len(texts)
+        found: List[Optional[np.ndarray]] = []
+        with self._lock:
+            for text in texts:
+                key = text_key(text, kind)
+                row = self._rows.get(key)
+                if row is None:
+                    self.misses += 1
+                    found.append(None)
+                    continue
+                self._rows.move_to_end(key)
+                self._dirty = True
+                self.hits += 1
+                found.append(np.array(self._matrix[row]))
+        return found
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]], kind: str = "document"):
+        """Store vectors of texts, journaling their rows"""
+        if not self.enabled or not texts:
+            return
+        with self._lock:
+            dim = len(vectors[0])
+            if self.dim != dim:
+                if self.dim is not None:
+                    print(f"Embedding size of {self.model_name} changed ({self.dim} -> {dim}); clearing its cache")
+                self._reset()
+                self.dim = dim
+                self._journal_path.unlink(missing_ok=True)
+            written = []
+            for text, vector in zip(texts, vectors):
+                key = text_key(text, kind)
+                row = self._rows.pop(key, None)
+                if row is None:
+                    row = self._allocate()
+                self._matrix[row] = vector
+                self._rows[key] = row
+                written.append((key, row))
+            self._matrix.flush()
+            self._append_journal(written)
+
+    def flush(self):
+        """Write the index with recency updates and journaled inserts"""
+        with self._lock:
+            if self._matrix is not None and self._dirty:
+                self._save_index()
+
+    def clear(self):
+        """Forget every entry and delete the cache files"""
+        with self._lock:
+            self._reset()
+            for path in (self._matrix_path, self._index_path, self._journal_path):
+                if path.exists():
+                    path.unlink()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "entries": len(self._rows),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups * 100) if lookups > 0 else 0,
+            "evictions": self.evictions,
+        }
+
+
+_shared_caches: Dict[Tuple[str, str], EmbeddingCache] = {}
+_shared_lock = threading.Lock()
+
+
+@atexit.register
+def _flush_shared_caches():
+    for cache in list(_shared_caches.values()):
+        try:
+            cache.flush()
+        except Exception as e:
+            print(f"Could not write embedding cache index of {cache.model_name}: {e}")
+
+
+def shared_embedding_cache(model_name: str, directory: Optional[str] = None) -> EmbeddingCache:
+    """The process-wide cache of a model, shared by every agent"""
+    root = str(directory or config.embedding_cache_path or DEFAULT_CACHE_DIR)
+    with _shared_lock:
+        cache = _shared_caches.get((root, model_name))
+        if cache is None:
+            cache = _shared_caches[(root, model_name)] = EmbeddingCache(model_name, root)
+        return cache
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings answered from an EmbeddingCache; only misses reach the wrapped model"""
+
+    def __init__(self, embeddings: Embeddings, model_name: Optional[str] = None,
+                 cache: Optional[EmbeddingCache] = None):
+        self.embeddings = embeddings
+        self.model_name = model_name or getattr(embeddings, "model", None) or type(embeddings).__name__
+        self.cache = cache if cache is not None else shared_embedding_cache(self.model_name)
+        self.embedding_calls = 0  # Requests made to the wrapped model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        cached = self.cache.get_many(texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        if missing:
+            self.embedding_calls += 1
+            fresh = dict(zip(missing, self.embeddings.embed_documents(missing)))
+            self.cache.put_many(missing, [fresh[text] for text in missing])
+            cached = [fresh[text] if vector is None else vector for text, vector in zip(texts, cached)]
+        return [vector.tolist() if isinstance(vector, np.ndarray) else list(vector) for vector in cached]
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.cache.get_many([text], kind="query")[0]
+        if vector is None:
+            self.embedding_calls += 1
+            vector = self.embeddings.embed_query(text)
+            self.cache.put_many([text], [vector], kind="query")
+            return list(vector)
+        return vector.tolist()
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Query embeddings of several texts, with one request for all misses"""
+        cached = self.cache.get_many(texts, kind="query")
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        if missing:
+            self.embedding_calls += 1
+            if len(missing) == 1:
+                fresh = {missing[0]: self.embeddings.embed_query(missing[0])}
+            else:
+                fresh = dict(zip(missing, self.embeddings.embed_documents(missing)))
+            self.cache.put_many(missing, [fresh[text] for text in missing], kind="query")
+            cached = [fresh[text] if vector is None else vector for text, vector in zip(texts, cached)]
+        return [vector.tolist() if isinstance(vector, np.ndarray) else list(vector) for vector in cached]
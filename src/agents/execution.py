@@ -1,12 +1,13 @@
 """
 Agent Execution - Simple execution tracking
 """
-from dataclasses import dataclass, field
+import sys
+from dataclasses import dataclass, field, fields
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import uuid
 
-@dataclass
+@dataclass(slots=True)
 class MCPInvocation:
     """Record of MCP tool call"""
     tool_name: str
@@ -15,16 +16,132 @@ class MCPInvocation:
     result: Dict[str, Any] = field(default_factory=dict)
     success: bool = True
     timestamp: datetime = field(default_factory=datetime.now)
+    duration: Optional[float] = None  # Seconds, when measured
+    attempts: int = 1  # Calls made, retries included
+    timed_out: bool = False
+    
+    def __post_init__(self):
+        # Tool and server names repeat across every invocation of a run
+        if isinstance(self.tool_name, str):
+            self.tool_name = sys.intern(self.tool_name)
+        if isinstance(self.server_name, str):
+            self.server_name = sys.intern(self.server_name)
 
-@dataclass
+class _Counter:
+    """Invocation counts and latency aggregates"""
+    __slots__ = ("total", "successful", "timed", "latency_total", "latency_min", "latency_max")
+    
+    def __init__(self):
+        self.total = 0
+        self.successful = 0
+        self.timed = 0
+        self.latency_total = 0.0
+        self.latency_min: Optional[float] = None
+        self.latency_max: Optional[float] = None
+    
+    def add(self, success: bool, duration: Optional[float]):
+        self.total += 1
+        if success:
+            self.successful += 1
+        if duration is not None:
+            self.timed += 1
+            self.latency_total += duration
+            self.latency_min = duration if self.latency_min is None else min(self.latency_min, duration)
+            self.latency_max = duration if self.latency_max is None else max(self.latency_max, duration)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_invocations": self.total,
+            "successful_invocations": self.successful,
+            "success_rate": (self.successful / self.total * 100) if self.total > 0 else 0,
+            "latency": {
+                "count": self.timed,
+                "total": self.latency_total,
+                "mean": (self.latency_total / self.timed) if self.timed > 0 else 0,
+                "min": self.latency_min,
+                "max": self.latency_max,
+            },
+        }
+
+class _StatisticsWindow:
+    """Counters accumulated since the window was opened"""
+    
+    def __init__(self):
+        self.started = datetime.now()
+        self.invocations = _Counter()
+        self.by_tool: Dict[str, _Counter] = {}
+        self.by_server: Dict[str, _Counter] = {}
+        self.sessions_ended = 0
+        self.sessions_by_status: Dict[str, int] = {}
+    
+    def to_dict(self) -> Dict[str, Any]:
+        stats = self.invocations.to_dict()
+        stats.update({
+            "since": self.started.isoformat(),
+            "sessions_ended": self.sessions_ended,
+            "sessions_by_status": dict(self.sessions_by_status),
+            "per_tool": {name: c.to_dict() for name, c in self.by_tool.items()},
+            "per_server": {name: c.to_dict() for name, c in self.by_server.items()},
+        })
+        return stats
+
+class ExecutionStatistics:
+    """Running execution counters fed by traces and sessions as they happen.
+    
+    Keeps lifetime totals plus a window that can be reset independently, so
+    polling dashboards read counters instead of rescanning every trace.
+    """
+    
+    def __init__(self):
+        self._lifetime = _StatisticsWindow()
+        self._window = _StatisticsWindow()
+    
+    def record_invocation(self, invocation: MCPInvocation):
+        """Count one tool invocation"""
+        for stats in (self._lifetime, self._window):
+            stats.invocations.add(invocation.success, invocation.duration)
+            stats.by_tool.setdefault(invocation.tool_name, _Counter()).add(invocation.success, invocation.duration)
+            stats.by_server.setdefault(invocation.server_name, _Counter()).add(invocation.success, invocation.duration)
+    
+    def record_session_end(self, session: 'AgentSession'):
+        """Count one finished session"""
+        for stats in (self._lifetime, self._window):
+            stats.sessions_ended += 1
+            stats.sessions_by_status[session.status] = stats.sessions_by_status.get(session.status, 0) + 1
+    
+    def snapshot(self, reset_window: bool = False) -> Dict[str, Any]:
+        """Lifetime statistics with the current window under "window"; optionally start a new window"""
+        stats = self._lifetime.to_dict()
+        stats["window"] = self._window.to_dict()
+        if reset_window:
+            self.reset_window()
+        return stats
+    
+    def reset_window(self):
+        """Start a new statistics window"""
+        self._window = _StatisticsWindow()
+
+@dataclass(slots=True)
 class ExecutionTrace:
     """Simple execution trace"""
     invocations: List[MCPInvocation] = field(default_factory=list)
     trace_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    statistics: Optional[ExecutionStatistics] = field(default=None, repr=False, compare=False)
     
     def add_invocation(self, invocation: MCPInvocation):
         """Add invocation to trace"""
         self.invocations.append(invocation)
+        if self.statistics is not None:
+            self.statistics.record_invocation(invocation)
+    
+    def __getstate__(self):
+        state = {f.name: getattr(self, f.name) for f in fields(self)}
+        state["statistics"] = None  # Counters belong to the live registry
+        return state
+    
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
     
     def analyze(self) -> Dict[str, Any]:
         """Simple trace analysis"""
@@ -51,6 +168,18 @@ class LiveTrace:
     session_id: str
     current_step: Optional[str] = None
     status: str = "idle"
+    completed_steps: int = 0
+    total_steps: int = 0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Status snapshot"""
+        return {
+            "session_id": self.session_id,
+            "current_step": self.current_step,
+            "status": self.status,
+            "completed_steps": self.completed_steps,
+            "total_steps": self.total_steps
+        }
 
 @dataclass
 class AgentSession:
@@ -63,6 +192,7 @@ class AgentSession:
     start_time: datetime = field(default_factory=datetime.now)
     end_time: Optional[datetime] = None
     status: str = "created"
+    statistics: Optional[ExecutionStatistics] = field(default=None, repr=False, compare=False)
     
     def __post_init__(self):
         """Initialize live trace"""
@@ -76,12 +206,27 @@ class AgentSession:
     
     def end(self, status: str = "completed"):
         """End session"""
+        already_ended = self.end_time is not None
         self.end_time = datetime.now()
         self.status = status
+        if self.statistics is not None and not already_ended:
+            self.statistics.record_session_end(self)
     
     def create_new_trace(self) -> ExecutionTrace:
         """Create new execution trace"""
-        trace = ExecutionTrace()
+        trace = ExecutionTrace(statistics=self.statistics)
         self.execution_traces.append(trace)
         return trace
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["statistics"] = None  # Counters belong to the live registry
+        return state
+    
+    def attach_statistics(self, statistics: Optional[ExecutionStatistics]):
+        """Feed this session and its traces into a statistics instance"""
+        self.statistics = statistics
+        for trace in self.execution_traces:
+            trace.statistics = statistics
+
     
\ No newline at end of file
@@ -0,0 +1,124 @@
+"""
+Keyword Index - Inverted index with BM25 ranking for offline tool retrieval
+"""
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from src.agents.vector_index import SearchHit
+
+# "Class2Relational" reads "Class to Relational": a 2 after a word or after a
+# digit ("KM32DOT" is KM3 to DOT) separates words. After a single letter it is
+# part of an identifier such as R2ML, so "R2ML2WSDL" is R2ML to WSDL.
+_TO_SEPARATOR = re.compile(r"(?:(?<=[A-Za-z]{2})|(?<=\d))2(?=[A-Za-z])")
+# Letters followed by digits, optionally followed by letters (KM3, R2ML, html5)
+# stay one word; other words split on CamelCase
+_WORD = re.compile(r"(?:[A-Z]+|[A-Z]?[a-z]+)\d+(?:[A-Z]+(?![a-z])|[a-z]+)?"
+                   r"|[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case words of text, splitting snake_case, CamelCase and `2` joins"""
+    return [word.lower() for word in _WORD.findall(_TO_SEPARATOR.sub(" ", text))]
+
+
+class KeywordIndex:
+    """Documents made of a name and a description, ranked by BM25.
+
+    Postings map each term to the term frequency of every document holding
+    it, so a query only touches the documents sharing one of its terms.
+    Name terms count `name_weight` times, as a name match says more about a
+    tool than a word of its description. Documents can be added, replaced
+    and removed by id without rebuilding.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, name_weight: int = 2):
+        self.k1 = k1
+        self.b = b
+        self.name_weight = name_weight
+        self._postings: Dict[str, Dict[str, int]] = {}  # term -> {id: term frequency}
+        self._terms: Dict[str, Counter] = {}  # id -> term frequencies, for removal
+        self._lengths: Dict[str, int] = {}
+        self._total_length = 0
+        self.texts: Dict[str, str] = {}
+        self.metadatas: Dict[str, Dict[str, Any]] = {}
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def __contains__(self, id: str) -> bool:
+        return id in self._terms
+
+    def add(self, id: str, name: str, description: str = "", metadata: Optional[Dict[str, Any]] = None):
+        """Index a document, replacing any previous one with the same id"""
+        self._discard(id)
+        terms = Counter(tokenize(description))
+        for term in tokenize(name):
+            terms[term] += self.name_weight
+        self._terms[id] = terms
+        length = sum(terms.values())
+        self._lengths[id] = length
+        self._total_length += length
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[id] = frequency
+        self.texts[id] = f"{name}\n{description}" if description else name
+        self.metadatas[id] = metadata or {}
+        self.version += 1
+
+    def _discard(self, id: str) -> bool:
+        terms = self._terms.pop(id, None)
+        if terms is None:
+            return False
+        for term in terms:
+            postings = self._postings[term]
+            del postings[id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(id)
+        del self.texts[id]
+        del self.metadatas[id]
+        return True
+
+    def remove(self, ids: Iterable[str]) -> int:
+        """Delete documents; returns how many were present"""
+        removed = sum(1 for id in ids if self._discard(id))
+        if removed:
+            self.version += 1
+        return removed
+
+    def clear(self):
+        self._postings.clear()
+        self._terms.clear()
+        self._lengths.clear()
+        self._total_length = 0
+        self.texts.clear()
+        self.metadatas.clear()
+        self.version += 1
+
+    def scores(self, query: str) -> Dict[str, float]:
+        """BM25 score of every document sharing a term with query"""
+        count = len(self._terms)
+        if count == 0:
+            return {}
+        average_length = self._total_length / count or 1.0
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for id, frequency in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[id] / average_length)
+                scores[id] = scores.get(id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return scores
+
+    def search(self, query: str, k: int = 4) -> List[SearchHit]:
+        """The k best matching documents, best first (none if no term matches)"""
+        best = heapq.nlargest(k, self.scores(query).items(), key=lambda item: item[1])
+        return [SearchHit(id, self.texts[id], score, self.metadatas[id]) for id, score in best]
+
+    def search_many(self, queries: Sequence[str], k: int = 4) -> List[List[SearchHit]]:
+        return [self.search(query, k) for query in queries]
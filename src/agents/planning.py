@@ -1,3 +1,4 @@
+import sys
 from dataclasses import dataclass, field
 from typing import Dict, Any, List, Optional
 from enum import Enum
@@ -9,6 +10,7 @@ class PlanStatus(Enum):
     IN_PROGRESS = "in_progress"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 class StepStatus(Enum):
     PENDING = "pending"
@@ -16,6 +18,7 @@ class StepStatus(Enum):
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 @dataclass
 class AgentGoal:
@@ -28,7 +31,52 @@ class AgentGoal:
         valid = len(self.description) > 0
         return {"valid": valid}
 
-@dataclass
+# String form of a StepOutput, for plans built from JSON: "$ref:<step>" or "$ref:<step>.model",
+# where <step> is the step_id of an earlier step or its 0-based position in the plan
+STEP_REF_PREFIX = "$ref:"
+STEP_OUTPUT_PARTS = ("text", "model")
+
+def result_text(result: Any) -> str:
+    """Text content of a tool result (an MCP CallToolResult or a plain value)"""
+    content = getattr(result, "content", None)
+    if content is None and isinstance(result, dict):
+        content = result.get("content")
+    if isinstance(content, list):
+        return "".join(getattr(block, "text", None) or (block.get("text", "") if isinstance(block, dict) else "")
+                       for block in content)
+    return result if isinstance(result, str) else str(result)
+
+@dataclass(slots=True)
+class StepOutput:
+    """Parameter value taken from an earlier step's output when the step runs"""
+    step: 'PlanStep'
+    part: str = "text"  # "text": the whole output; "model": the model an apply tool produced
+    
+    def resolve(self) -> str:
+        """The referenced output; the referenced step must have completed"""
+        if self.step.status != StepStatus.COMPLETED:
+            raise ValueError(f"Step {self.step.step_id} ({self.step.tool_name}) has no output yet")
+        text = result_text(self.step.result)
+        if self.part == "model":
+            # Apply tools answer "Transformation X applied successfully:\n<model>"
+            header, separator, body = text.partition("\n")
+            if separator and "applied successfully" in header:
+                return body
+        return text
+    
+    def ref(self) -> str:
+        """The "$ref:" string this reference is written as in plans and traces"""
+        suffix = "" if self.part == "text" else f".{self.part}"
+        return f"{STEP_REF_PREFIX}{self.step.step_id}{suffix}"
+
+def _map_parameters(value: Any, convert) -> Any:
+    if isinstance(value, dict):
+        return {k: _map_parameters(v, convert) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_map_parameters(v, convert) for v in value]
+    return convert(value)
+
+@dataclass(slots=True)
 class PlanStep:
     """Single workflow step"""
     tool_name: str
@@ -42,6 +90,31 @@ class PlanStep:
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
     
+    def __post_init__(self):
+        # Tool and server names repeat across steps of every plan
+        if isinstance(self.tool_name, str):
+            self.tool_name = sys.intern(self.tool_name)
+        if isinstance(self.server_name, str):
+            self.server_name = sys.intern(self.server_name)
+    
+    def references(self) -> List[StepOutput]:
+        """StepOutput values among the parameters"""
+        found = []
+        _map_parameters(self.parameters, lambda v: found.append(v) if isinstance(v, StepOutput) else None)
+        return found
+    
+    def resolved_parameters(self) -> Dict[str, Any]:
+        """Parameters with every StepOutput replaced by the referenced output"""
+        if not self.references():
+            return self.parameters or {}
+        return _map_parameters(self.parameters, lambda v: v.resolve() if isinstance(v, StepOutput) else v)
+    
+    def serializable_parameters(self) -> Dict[str, Any]:
+        """Parameters with every StepOutput written as its "$ref:" string, for traces and reports"""
+        if not self.references():
+            return self.parameters or {}
+        return _map_parameters(self.parameters, lambda v: v.ref() if isinstance(v, StepOutput) else v)
+    
     def can_execute(self) -> bool:
         """Check if step can run"""
         return all(dep.status == StepStatus.COMPLETED for dep in self.dependencies)
@@ -68,19 +141,61 @@ class PlanStep:
         self.status = StepStatus.FAILED
         self.end_time = datetime.now()
         self.result = {"error": error}
+    
+    def mark_cancelled(self):
+        """Mark as cancelled"""
+        self.status = StepStatus.CANCELLED
+        self.end_time = datetime.now()
+        self.result = {"error": "cancelled"}
 
 @dataclass
 class WorkflowPlan:
-    """Simple workflow plan"""
+    """Simple workflow plan.
+    
+    Steps run in the order they were added unless they say otherwise: a step
+    added without dependencies depends on the step before it. Plans whose
+    independent steps may run concurrently set parallel=True.
+    """
     goal: AgentGoal
     steps: List[PlanStep] = field(default_factory=list)
+    parallel: bool = False
     status: PlanStatus = PlanStatus.CREATED
     plan_id: str = field(default_factory=lambda: str(uuid.uuid4()))
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
     
     def add_step(self, step: PlanStep):
-        """Add step to plan"""
+        """Add step to plan.
+        
+        "$ref:<step>[.<part>]" parameter strings, where <step> is the step_id
+        or 0-based index of an earlier step, become StepOutput references,
+        and referenced steps become dependencies. Unless the plan is parallel,
+        a step left without dependencies depends on the previous step. Raises
+        ValueError for a reference to no earlier step or to an unknown part.
+        """
+        by_id = {s.step_id: s for s in self.steps}
+        
+        def link(value: Any) -> Any:
+            if not (isinstance(value, str) and value.startswith(STEP_REF_PREFIX)):
+                return value
+            ref, _, part = value[len(STEP_REF_PREFIX):].partition(".")
+            target = by_id.get(ref)
+            if target is None and ref.isdigit() and int(ref) < len(self.steps):
+                target = self.steps[int(ref)]
+            if target is None:
+                raise ValueError(f"{value!r} does not name an earlier step of the plan")
+            part = part or "text"
+            if part not in STEP_OUTPUT_PARTS:
+                raise ValueError(f"{value!r} refers to unknown output part {part!r} (expected one of {STEP_OUTPUT_PARTS})")
+            return StepOutput(target, part)
+        
+        if step.parameters:
+            step.parameters = _map_parameters(step.parameters, link)
+        for reference in step.references():
+            if not any(dep is reference.step for dep in step.dependencies):
+                step.dependencies.append(reference.step)
+        if not self.parallel and not step.dependencies and self.steps:
+            step.dependencies.append(self.steps[-1])
         self.steps.append(step)
         self._update_step_readiness()
     
@@ -128,6 +243,17 @@ class WorkflowPlan:
         self.start_time = datetime.now()
         self._update_step_readiness()
     
+    def abort(self) -> bool:
+        """Abort the plan; steps that have not finished are cancelled"""
+        if self.status in (PlanStatus.COMPLETED, PlanStatus.FAILED, PlanStatus.CANCELLED):
+            return False
+        self.status = PlanStatus.CANCELLED
+        self.end_time = datetime.now()
+        for step in self.steps:
+            if step.status in (StepStatus.PENDING, StepStatus.READY):
+                step.mark_cancelled()
+        return True
+    
     def check_completion(self) -> bool:
         """Check if plan is complete"""
         if self.status != PlanStatus.IN_PROGRESS:
@@ -0,0 +1,88 @@
+"""
+Call Resilience - Retry with jittered backoff and per-server circuit breakers
+"""
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from src.core.config import config
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of calling a server whose circuit breaker is open"""
+
+
+@dataclass
+class RetryPolicy:
+    """How often, and after how long, a failed tool call is retried"""
+    max_retries: int = 2  # Retries after the first attempt
+    base_delay: float = 0.5  # Seconds; doubles with every retry
+    max_delay: float = 8.0
+    retry_on_timeout: bool = False  # Timed out calls usually hang again
+
+    @classmethod
+    def from_config(cls) -> 'RetryPolicy':
+        """Policy from the global SystemConfig"""
+        return cls(max_retries=config.max_retries, base_delay=config.retry_backoff)
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait before retry number `attempt` (full jitter)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    """Fails calls fast after repeated failures of one server.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    are refused for `reset_timeout` seconds. Then one trial call is let
+    through (half-open): success closes the circuit, failure opens it again.
+    A trial that never reports back is replaced after another reset_timeout.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+        self.failure_threshold = max(1, failure_threshold or config.circuit_failure_threshold)
+        self.reset_timeout = config.circuit_reset_timeout if reset_timeout is None else reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self._trial_started: Optional[float] = None
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            now = time.monotonic()
+            if self._trial_started is not None and now - self._trial_started < self.reset_timeout:
+                return False
+            self._trial_started = now
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_started = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+        self._trial_started = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+        }
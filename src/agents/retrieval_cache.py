@@ -0,0 +1,82 @@
+"""
+Retrieval Cache - LRU cache of tool/model retrieval results per query
+"""
+import re
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from src.core.config import config
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query"""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+class RetrievalCache:
+    """Retrieved (tools, models) keyed by normalized query and result sizes.
+
+    Each entry remembers the index version it was computed against; a lookup
+    under another version is a miss and drops the entry, so any change to the
+    indexes invalidates what was retrieved from them. The least recently used
+    entries are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = config.retrieval_cache_size if max_entries is None else max_entries
+        self._entries: OrderedDict = OrderedDict()  # key -> (index version, tools, models)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def make_key(query: str, *params: Hashable) -> Tuple:
+        return (normalize_query(query),) + params
+
+    def get(self, key: Tuple, version: int) -> Optional[Tuple[List[Any], List[Any]]]:
+        """Cached (tools, models), or None on a miss"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] != version:
+            del self._entries[key]
+            self.invalidations += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return list(entry[1]), list(entry[2])
+
+    def put(self, key: Tuple, version: int, tools: List[Any], models: List[Any]):
+        """Store a result, evicting the least recently used entries if full"""
+        if not self.enabled:
+            return
+        self._entries[key] = (version, tuple(tools), tuple(models))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups * 100) if lookups > 0 else 0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
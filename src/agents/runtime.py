@@ -0,0 +1,76 @@
+"""
+Executor Runtime - Long-lived background event loop with a synchronous facade
+"""
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional
+
+
+class ExecutorRuntime:
+    """Event loop running in a daemon thread.
+
+    Synchronous callers submit coroutines with run(); every call lands on the
+    same loop, so MCP sessions opened by one call stay usable by the next.
+    """
+
+    def __init__(self, name: str = "mcp-executor"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The runtime loop, started on first use"""
+        self.start()
+        return self._loop
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the loop thread if it is not running"""
+        with self._lock:
+            if self.running:
+                return
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def serve():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(started.set)
+                loop.run_forever()
+
+            self._loop = loop
+            self._thread = threading.Thread(target=serve, name=self.name, daemon=True)
+            self._thread.start()
+            started.wait()
+
+    def in_runtime_thread(self) -> bool:
+        """Whether the caller is running on the runtime loop thread"""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the runtime loop and block until it finishes"""
+        if self.in_runtime_thread():
+            coro.close()
+            raise RuntimeError("ExecutorRuntime.run() called from its own loop; await the coroutine instead")
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def stop(self) -> None:
+        """Stop the loop and join its thread"""
+        with self._lock:
+            if not self.running:
+                return
+            loop, thread = self._loop, self._thread
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+            self._loop = None
+            self._thread = None
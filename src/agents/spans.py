@@ -0,0 +1,168 @@
+"""
+Executor Spans - Per-phase timings of tool calls, with histograms and Chrome trace export
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from src.core.config import config
+
+# Histogram buckets are powers of two in microseconds: bucket i holds durations < 2**i us
+_BUCKETS = 40
+
+
+class _Histogram:
+    """Count, total and log2 buckets of one phase's durations"""
+    __slots__ = ("count", "total_ns", "min_ns", "max_ns", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns: Optional[int] = None
+        self.max_ns = 0
+        self.buckets = [0] * _BUCKETS
+
+    def add(self, duration_ns: int):
+        self.count += 1
+        self.total_ns += duration_ns
+        if self.min_ns is None or duration_ns < self.min_ns:
+            self.min_ns = duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+        bucket = (duration_ns // 1000).bit_length()
+        self.buckets[bucket if bucket < _BUCKETS else _BUCKETS - 1] += 1
+
+    def percentile(self, q: float) -> float:
+        """Upper bound, in seconds, of the bucket holding the q-th percentile"""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(2 ** i / 1e6, self.max_ns / 1e9)
+        return self.max_ns / 1e9
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total": self.total_ns / 1e9,
+            "mean": (self.total_ns / self.count / 1e9) if self.count else 0,
+            "min": (self.min_ns or 0) / 1e9,
+            "max": self.max_ns / 1e9,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "buckets_us": {2 ** i: n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class _Span:
+    __slots__ = ("recorder", "name", "args", "start")
+
+    def __init__(self, recorder: 'SpanRecorder', name: str, args: Dict[str, Any]):
+        self.recorder = recorder
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.record(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class SpanRecorder:
+    """Records named spans (connect, session_acquire, serialize, round_trip,
+    decode, trace_record, ...) around the executor's hot path.
+
+    Every span feeds a per-phase histogram; the most recent max_spans spans
+    are also kept for Chrome trace export (chrome://tracing, Perfetto).
+    When disabled, span() returns a shared no-op context manager.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, max_spans: Optional[int] = None):
+        self.enabled = config.executor_spans if enabled is None else enabled
+        self._spans: deque = deque(maxlen=max_spans or config.max_spans)  # (name, start_ns, end_ns, task id, args)
+        self._histograms: Dict[str, _Histogram] = {}
+        self._origin_ns = time.perf_counter_ns()
+
+    def span(self, name: str, **args):
+        """Context manager timing one phase"""
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name, args)
+
+    def record(self, name: str, start_ns: int, end_ns: int, args: Optional[Dict[str, Any]] = None):
+        """Add a finished span"""
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = self._histograms[name] = _Histogram()
+        histogram.add(end_ns - start_ns)
+        try:
+            task = id(asyncio.current_task())
+        except RuntimeError:
+            task = threading.get_ident()  # Outside an event loop
+        self._spans.append((name, start_ns, end_ns, task, args))
+
+    def histogram(self, name: str) -> Dict[str, Any]:
+        """Duration statistics (seconds) of one phase"""
+        histogram = self._histograms.get(name)
+        return histogram.to_dict() if histogram else _Histogram().to_dict()
+
+    def histograms(self) -> Dict[str, Dict[str, Any]]:
+        """Duration statistics (seconds) of every phase"""
+        return {name: h.to_dict() for name, h in self._histograms.items()}
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Kept spans in Chrome trace event format"""
+        events: List[Dict[str, Any]] = []
+        lanes: Dict[int, int] = {}  # One trace row per asyncio task
+        for name, start_ns, end_ns, task, args in list(self._spans):
+            lane = lanes.setdefault(task, len(lanes) + 1)
+            event = {
+                "name": name,
+                "cat": "executor",
+                "ph": "X",
+                "ts": (start_ns - self._origin_ns) / 1000,
+                "dur": (end_ns - start_ns) / 1000,
+                "pid": 1,
+                "tid": lane,
+            }
+            if args:
+                event["args"] = args
+            events.append(event)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path: str) -> str:
+        """Write the Chrome trace JSON to a file"""
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f, default=str)
+        return path
+
+    def reset(self):
+        """Forget all spans and histograms"""
+        self._spans.clear()
+        self._histograms = {}
+
+    def __len__(self) -> int:
+        return len(self._spans)
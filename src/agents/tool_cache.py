@@ -0,0 +1,127 @@
+"""
+Tool Result Cache - LRU/TTL cache for read-only MCP tool calls
+"""
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from src.core.config import config
+
+# Name fragments of tools that change state; never cached whatever they declare
+_NEVER_CACHED = ("apply_", "_apply")
+
+
+def get_tool_name(tool: Any) -> str:
+    """Name of an MCP Tool or of its dict form"""
+    return tool.get("name", "") if isinstance(tool, dict) else getattr(tool, "name", "")
+
+
+def is_read_only_tool(tool: Any) -> bool:
+    """Whether a tool is declared read-only by its server (MCP readOnlyHint)"""
+    if any(fragment in get_tool_name(tool) for fragment in _NEVER_CACHED):
+        return False
+    annotations = tool.get("annotations") if isinstance(tool, dict) else getattr(tool, "annotations", None)
+    if annotations is None:
+        return False
+    if isinstance(annotations, dict):
+        return bool(annotations.get("readOnlyHint"))
+    return bool(getattr(annotations, "readOnlyHint", False))
+
+
+class ToolResultCache:
+    """Results of read-only tool calls, keyed by server, tool and arguments.
+
+    Arguments are canonicalized (sorted JSON); any argument naming an existing
+    file also contributes the file's mtime and size, so editing an input model
+    invalidates the entries that read it. Entries expire after `ttl` seconds
+    and the least recently used ones are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        self.max_entries = config.tool_cache_size if max_entries is None else max_entries
+        self.ttl = config.tool_cache_ttl if ttl is None else ttl
+        self._entries: OrderedDict = OrderedDict()  # key -> (expires_at, result)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def _file_stamps(arguments: Dict[str, Any]) -> Tuple:
+        stamps = []
+        for name, value in sorted(arguments.items()):
+            if isinstance(value, str) and value and os.path.isfile(value):
+                stat = os.stat(value)
+                stamps.append((name, stat.st_mtime_ns, stat.st_size))
+        return tuple(stamps)
+
+    def make_key(self, server_name: str, tool_name: str, arguments: Optional[Dict[str, Any]]) -> Tuple:
+        """Cache key for a call"""
+        arguments = arguments or {}
+        canonical = json.dumps(arguments, sort_keys=True, separators=(",", ":"), default=str)
+        return (server_name, tool_name, canonical, self._file_stamps(arguments))
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """Cached result, or None on a miss"""
+        entry = self._entries.get(key)
+        if entry is not None and self.ttl and entry[0] <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Tuple, result: Any):
+        """Store a result, evicting the least recently used entries if full"""
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0
+        self._entries[key] = (expires_at, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, server_name: Optional[str] = None, tool_name: Optional[str] = None) -> int:
+        """Drop entries of a server and/or tool (all entries when both are None)"""
+        keys = [key for key in self._entries
+                if (server_name is None or key[0] == server_name) and (tool_name is None or key[1] == tool_name)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def discard(self, key: Tuple) -> bool:
+        """Drop one entry"""
+        return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        self._entries.clear()
+
+    def __contains__(self, key: Tuple) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups * 100) if lookups > 0 else 0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
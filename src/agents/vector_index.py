@@ -0,0 +1,201 @@
+"""
+Vector Index - In-memory cosine similarity index over embedded texts
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_INITIAL_ROWS = 64
+
+
+@dataclass(slots=True)
+class SearchHit:
+    """One search result: the stored text, its metadata and cosine score"""
+    id: str
+    text: str
+    score: float
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Rows scaled to unit length (zero rows are left as they are)"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class VectorIndex:
+    """Texts embedded into a contiguous matrix of unit-length float32 rows.
+
+    Row i of the matrix belongs to ids[i], texts[i] and metadatas[i]. Adding
+    an existing id replaces its row; removing an id moves the last row into
+    its place, so every change costs O(changed rows) and the first `size`
+    rows stay dense for the matrix product of a search. `version` grows with
+    every change, so results derived from the index can tell they are stale.
+    """
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+        self._matrix: Optional[np.ndarray] = None
+        self._size = 0
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self._row_of: Dict[str, int] = {}
+        self.version = 0
+
+    @classmethod
+    def from_texts(cls, texts: Sequence[str], embeddings: Embeddings,
+                   metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+                   ids: Optional[Sequence[str]] = None) -> "VectorIndex":
+        index = cls(embeddings)
+        index.add_texts(texts, metadatas=metadatas, ids=ids)
+        return index
+
+    @property
+    def dim(self) -> Optional[int]:
+        return None if self._matrix is None else self._matrix.shape[1]
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """The stored unit vectors, one row per id (a view, not a copy)"""
+        if self._matrix is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return self._matrix[:self._size]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, id: str) -> bool:
+        return id in self._row_of
+
+    def _reserve(self, rows: int, dim: int):
+        if self._matrix is None:
+            self._matrix = np.zeros((max(_INITIAL_ROWS, rows), dim), dtype=np.float32)
+            return
+        if self._matrix.shape[1] != dim:
+            raise ValueError(f"Vectors of size {dim} do not fit an index of size {self._matrix.shape[1]}")
+        if rows > self._matrix.shape[0]:
+            grown = np.zeros((max(rows, self._matrix.shape[0] * 2), dim), dtype=np.float32)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+
+    def add_texts(self, texts: Sequence[str], metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+                  ids: Optional[Sequence[str]] = None) -> List[str]:
+        """Embed and insert texts; ids already present are updated in place"""
+        texts = list(texts)
+        if not texts:
+            return []
+        return self.add_vectors(self.embeddings.embed_documents(texts), texts, metadatas=metadatas, ids=ids)
+
+    def add_vectors(self, vectors: Sequence[Sequence[float]], texts: Sequence[str],
+                    metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+                    ids: Optional[Sequence[str]] = None) -> List[str]:
+        """Insert already embedded texts (ids default to the texts themselves)"""
+        texts = list(texts)
+        ids = list(ids) if ids is not None else texts
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        if not (len(ids) == len(texts) == len(metadatas) == len(vectors)):
+            raise ValueError("texts, vectors, metadatas and ids must have the same length")
+        if not texts:
+            return []
+        unit = _normalize(np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1))
+        self._reserve(self._size + sum(1 for id in set(ids) if id not in self._row_of), unit.shape[1])
+        for vector, text, metadata, id in zip(unit, texts, metadatas, ids):
+            row = self._row_of.get(id)
+            if row is None:
+                row = self._size
+                self._size += 1
+                self._row_of[id] = row
+                self.ids.append(id)
+                self.texts.append(text)
+                self.metadatas.append(metadata)
+            else:
+                self.texts[row] = text
+                self.metadatas[row] = metadata
+            self._matrix[row] = vector
+        self.version += 1
+        return ids
+
+    def update_texts(self, texts: Sequence[str], metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+                     ids: Optional[Sequence[str]] = None) -> List[str]:
+        """Re-embed the texts of existing ids (alias of add_texts, which upserts)"""
+        return self.add_texts(texts, metadatas=metadatas, ids=ids)
+
+    def remove(self, ids: Iterable[str]) -> int:
+        """Delete ids, filling each hole with the last row; returns how many were present"""
+        removed = 0
+        for id in ids:
+            row = self._row_of.pop(id, None)
+            if row is None:
+                continue
+            last = self._size - 1
+            if row != last:
+                moved = self.ids[last]
+                self._matrix[row] = self._matrix[last]
+                self.ids[row] = moved
+                self.texts[row] = self.texts[last]
+                self.metadatas[row] = self.metadatas[last]
+                self._row_of[moved] = row
+            self.ids.pop()
+            self.texts.pop()
+            self.metadatas.pop()
+            self._size = last
+            removed += 1
+        if removed:
+            self.version += 1
+        return removed
+
+    def clear(self):
+        self._matrix = None
+        self._size = 0
+        self.ids, self.texts, self.metadatas = [], [], []
+        self._row_of = {}
+        self.version += 1
+
+    def _embed_queries(self, queries: Sequence[str]) -> np.ndarray:
+        embed_queries = getattr(self.embeddings, "embed_queries", None)
+        vectors = embed_queries(list(queries)) if embed_queries else [self.embeddings.embed_query(q) for q in queries]
+        return _normalize(np.asarray(vectors, dtype=np.float32).reshape(len(queries), -1))
+
+    def _top_k(self, scores: np.ndarray, k: int) -> List[List[SearchHit]]:
+        """Best k rows of each score row: argpartition, then sort only those k"""
+        k = min(k, self._size)
+        if k <= 0:
+            return [[] for _ in range(scores.shape[0])]
+        if k < self._size:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(self._size), (scores.shape[0], self._size))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        return [
+            [SearchHit(self.ids[row], self.texts[row], float(score), self.metadatas[row])
+             for row, score in zip(rows.tolist(), row_scores.tolist())]
+            for rows, row_scores in zip(top, top_scores)
+        ]
+
+    def search_by_vector(self, vector: Sequence[float], k: int = 4) -> List[SearchHit]:
+        """The k stored texts most similar to an already embedded query"""
+        if self._size == 0:
+            return []
+        query = _normalize(np.asarray(vector, dtype=np.float32).reshape(1, -1))
+        return self._top_k(query @ self.vectors.T, k)[0]
+
+    def search(self, query: str, k: int = 4) -> List[SearchHit]:
+        """The k stored texts most similar to query, best first"""
+        if self._size == 0:
+            return []
+        return self._top_k(self._embed_queries([query]) @ self.vectors.T, k)[0]
+
+    def search_many(self, queries: Sequence[str], k: int = 4) -> List[List[SearchHit]]:
+        """search for several queries with one embedding request and one matrix product"""
+        if not queries:
+            return []
+        if self._size == 0:
+            return [[] for _ in queries]
+        return self._top_k(self._embed_queries(queries) @ self.vectors.T, k)
@@ -4,27 +4,105 @@ Workflow Executor - Simple workflow execution
 import os
 import re
 import asyncio
-from typing import Dict, Any, Optional
+import math
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator, Awaitable, Callable
 import time
+from contextlib import asynccontextmanager, AsyncExitStack
 
+from src.core.config import config
 from src.core.megamodel import MegamodelRegistry
 from src.mcp_ext.client import MCPClient
+from src.mcp_ext.pool import MCPClientPool, TRANSPORT_ERRORS
+from src.mcp_ext.batch import BATCH_TOOL_NAME, decode_batch_result
 from src.agents.execution import MCPInvocation
-from src.agents.planning import WorkflowPlan, PlanStep
+from src.agents.runtime import ExecutorRuntime
+from src.agents.resilience import RetryPolicy, CircuitBreaker, CircuitOpenError
+from src.agents.tool_cache import ToolResultCache, is_read_only_tool, get_tool_name
+from src.agents.spans import SpanRecorder
+from src.agents.planning import WorkflowPlan, PlanStep, PlanStatus, StepStatus
 
 # TODO: perform an Object grounding. Check the feasability to cover other LLM planning criteria
 class WorkflowExecutor:
     """Simple workflow executor"""
     
-    def __init__(self, registry: MegamodelRegistry):
+    def __init__(self, registry: MegamodelRegistry, max_parallel_steps: Optional[int] = None,
+                 max_parallel_per_server: Optional[int] = None, runtime: Optional[ExecutorRuntime] = None,
+                 pool: Optional[MCPClientPool] = None, retry_policy: Optional[RetryPolicy] = None,
+                 result_cache: Optional[ToolResultCache] = None, speculative: Optional[bool] = None,
+                 spans: Optional[SpanRecorder] = None):
         self.registry = registry
-        self.mcp_clients = {}  # Store MCP clients by server name
+        # Per-phase timings of every call (config.executor_spans switches them off)
+        self.spans = spans or SpanRecorder()
+        self.mcp_clients = {}  # Dedicated MCP clients by server name; take precedence over the pool
+        # Steps on other servers lease a warm session from the pool
+        self.pool = pool or MCPClientPool(spans=self.spans)
+        # Concurrency bounds for workflow steps, overall and per server
+        self.max_parallel_steps = max(1, max_parallel_steps or config.max_parallel_steps)
+        self.max_parallel_per_server = max(1, max_parallel_per_server or self.max_parallel_steps)
+        # Synchronous entry points run on this long-lived loop so MCP sessions
+        # survive from one call to the next
+        self.runtime = runtime or ExecutorRuntime()
+        self._connect_locks: Dict[str, asyncio.Lock] = {}
+        self._last_used: Dict[str, float] = {}
+        self._clients_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Call deadlines in seconds, by tool and by server (else config.default_timeout; 0 disables)
+        self.tool_timeouts: Dict[str, float] = {}
+        self.server_timeouts: Dict[str, float] = {}
+        self.retry_policy = retry_policy or RetryPolicy.from_config()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._aborts: Dict[str, tuple] = {}  # plan_id -> (loop, abort event) of running workflows
+        # Results of tools their server declares read-only
+        self.result_cache = result_cache or ToolResultCache()
+        self._server_tools: Dict[str, tuple] = {}  # server -> (registry version, tool names, cacheable names)
+        self.batch_size = max(1, config.tool_batch_size)  # Calls per batch_call_tool request
+        # Speculative mode: warm servers and pre-run read-only steps while workflows run
+        self.speculative = config.speculative_prefetch if speculative is None else speculative
+        self.max_speculative_steps = 2
+        self._prefetching: Dict[tuple, asyncio.Task] = {}  # cache key -> speculative call
+        self._in_flight: Dict[tuple, asyncio.Future] = {}  # cache key -> read-only call made by a step
+        self.speculation_stats = {"launched": 0, "used": 0, "discarded": 0}
     
     async def connect_to_mcp_server(self, server_name: str) -> Optional[MCPClient]:
-        """Connect to an MCP server using the modern protocol"""
-        if server_name in self.mcp_clients:
-            return self.mcp_clients[server_name]
-            
+        """Connect to an MCP server using the modern protocol.
+        
+        Connections are reused across steps and workflows. One that has been
+        idle longer than config.mcp_health_check_interval is pinged first and
+        replaced if the server no longer answers.
+        """
+        loop = asyncio.get_running_loop()
+        if self._clients_loop is not None and self._clients_loop is not loop:
+            # Sessions are bound to the loop that opened them
+            await self._abandon_clients()
+        
+        client = self.mcp_clients.get(server_name)
+        if client is not None and await self._is_healthy(server_name, client):
+            self._last_used[server_name] = time.monotonic()
+            return client
+        
+        # Concurrent steps on the same server share a single connection
+        lock = self._connect_locks.setdefault(server_name, asyncio.Lock())
+        async with lock:
+            client = self.mcp_clients.get(server_name)
+            if client is not None and await self._is_healthy(server_name, client):
+                return client
+            if client is not None:
+                await self._drop_client(server_name)
+            client = await self._connect(server_name)
+            if client is not None:
+                self._clients_loop = loop
+                self._last_used[server_name] = time.monotonic()
+            return client
+    
+    async def _is_healthy(self, server_name: str, client: MCPClient) -> bool:
+        idle = time.monotonic() - self._last_used.get(server_name, time.monotonic())
+        if idle < config.mcp_health_check_interval or not hasattr(client, "ping"):
+            return True
+        healthy = await client.ping()
+        if not healthy:
+            print(f"MCP server {server_name} did not answer a health check, reconnecting")
+        return healthy
+    
+    def _script_path(self, server_name: str) -> Optional[str]:
         server = self.registry.get_mcp_server(server_name)
         if not server:
             raise ValueError(f"Server not found: {server_name}")
@@ -33,58 +111,257 @@ class WorkflowExecutor:
         server_script_path = server.metadata.get("script_path")
         if not server_script_path:
             print(f"Warning: No script path configured for server {server_name}")
+        return server_script_path
+    
+    async def _connect(self, server_name: str) -> Optional[MCPClient]:
+        server_script_path = self._script_path(server_name)
+        if not server_script_path:
             return None
             
         # Create and connect client
         client = MCPClient()
         try:
-            await client.connect_to_server(server_script_path)
+            await client.start(server_script_path)
             self.mcp_clients[server_name] = client
             return client
         except Exception as e:
             print(f"Failed to connect to MCP server {server_name}: {str(e)}")
             return None
     
+    async def _drop_client(self, server_name: str):
+        client = self.mcp_clients.pop(server_name, None)
+        self._last_used.pop(server_name, None)
+        if client is None:
+            return
+        try:
+            await (client.stop() if hasattr(client, "stop") else client.cleanup())
+        except Exception as e:
+            print(f"Error closing MCP client for {server_name}: {str(e)}")
+    
+    async def _abandon_clients(self):
+        """Forget clients opened on another loop, closing them there if it still runs"""
+        old_loop, clients = self._clients_loop, self.mcp_clients
+        self.mcp_clients, self._last_used, self._connect_locks = {}, {}, {}
+        self._clients_loop = None
+        if old_loop is not None and old_loop.is_running() and not old_loop.is_closed():
+            for client in clients.values():
+                closer = client.stop() if hasattr(client, "stop") else client.cleanup()
+                asyncio.run_coroutine_threadsafe(closer, old_loop)
+    
+    def _pool_size(self, server_name: str) -> Optional[int]:
+        """1 for a stateful server (metadata "stateful"), so its calls share one process; else the pool default"""
+        server = self.registry.get_mcp_server(server_name)
+        return 1 if server and server.metadata.get("stateful") else None
+    
+    @asynccontextmanager
+    async def _session_for(self, server_name: str, timeout: Optional[float] = None):
+        """MCP session for one call: the dedicated client if any, else a pool lease.
+        
+        Connecting, spawning and waiting for a free pooled session take at most `timeout`.
+        """
+        if server_name in self.mcp_clients:
+            client = await asyncio.wait_for(self.connect_to_mcp_server(server_name), timeout)
+            if not client:
+                raise ValueError(f"Could not connect to MCP server: {server_name}")
+            yield await client.get_session()
+            return
+        
+        server_script_path = self._script_path(server_name)
+        if not server_script_path:
+            raise ValueError(f"Could not connect to MCP server: {server_name}")
+        async with self.pool.lease(server_script_path, timeout, self._pool_size(server_name)) as client:
+            yield await client.get_session()
+    
+    async def warm_servers(self, server_names: Optional[List[str]] = None, count: Optional[int] = None):
+        """Start pooled sessions ahead of the first step (default: every registered server)"""
+        if server_names is None:
+            server_names = list(self.registry.mcp_servers)
+        servers = [(self._script_path(name), self._pool_size(name)) for name in server_names if name not in self.mcp_clients]
+        await asyncio.gather(*(self.pool.warm(script, count, size) for script, size in servers if script))
+    
+    def timeout_for(self, step: PlanStep) -> Optional[float]:
+        """Deadline for one call of a step, or None for no deadline"""
+        return self._timeout(step.server_name, step.tool_name)
+    
+    def _timeout(self, server_name: str, tool_name: str) -> Optional[float]:
+        timeout = self.tool_timeouts.get(tool_name)
+        if timeout is None:
+            timeout = self.server_timeouts.get(server_name)
+        if timeout is None:
+            timeout = config.default_timeout
+        return timeout or None
+    
+    def circuit_breaker(self, server_name: str) -> CircuitBreaker:
+        """Circuit breaker guarding calls to a server"""
+        breaker = self._breakers.get(server_name)
+        if breaker is None:
+            breaker = self._breakers[server_name] = CircuitBreaker()
+        return breaker
+    
+    def circuit_status(self) -> Dict[str, Dict[str, Any]]:
+        """Circuit breaker state per server"""
+        return {name: breaker.to_dict() for name, breaker in self._breakers.items()}
+    
+    def _tools_of(self, server_name: str) -> tuple:
+        """(tool names, cacheable tool names) of a server, rebuilt when the registry changes"""
+        version = getattr(self.registry, "version", None)
+        cached = self._server_tools.get(server_name)
+        if cached is None or cached[0] != version:
+            tools = self.registry.discover_tools(server_name)
+            names = {get_tool_name(tool) for tool in tools}
+            cacheable = {get_tool_name(tool) for tool in tools if is_read_only_tool(tool)}
+            cached = self._server_tools[server_name] = (version, names, cacheable)
+        return cached[1], cached[2]
+    
+    def is_cacheable(self, server_name: str, tool_name: str) -> bool:
+        """Whether a tool's results may be cached (declared readOnlyHint, never apply tools)"""
+        return tool_name in self._tools_of(server_name)[1]
+    
+    def supports_batch(self, server_name: str) -> bool:
+        """Whether a server exposes batch_call_tool (recorded in its metadata at discovery)"""
+        server = self.registry.get_mcp_server(server_name)
+        return bool(getattr(server, "metadata", None) and server.metadata.get("supports_batch"))
+    
+    def _should_retry(self, error: Exception, attempts: int) -> bool:
+        if attempts > self.retry_policy.max_retries:
+            return False
+        if isinstance(error, asyncio.TimeoutError):
+            return self.retry_policy.retry_on_timeout
+        return True
+    
+    async def _call_tool(self, server_name: str, tool_name: str, arguments: Dict[str, Any],
+                         timeout: Optional[float], state: Dict[str, Any]) -> Any:
+        """Call a tool under its deadline, the retry policy and the server's circuit breaker.
+        
+        Each attempt's deadline covers acquiring the session (a server that
+        hangs while spawning or initializing counts as timed out) and the call.
+        state["attempts"] and state["timed_out"] are updated as calls are made.
+        """
+        breaker = self.circuit_breaker(server_name)
+        loop = asyncio.get_running_loop()
+        while True:
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit open for MCP server {server_name}, not calling it")
+            state["attempts"] += 1
+            try:
+                # Call the tool on a dedicated or pooled MCP session
+                deadline = None if timeout is None else loop.time() + timeout
+                async with AsyncExitStack() as stack:
+                    with self.spans.span("session_acquire", server=server_name):
+                        session = await stack.enter_async_context(self._session_for(server_name, timeout))
+                    remaining = None if deadline is None else max(0.0, deadline - loop.time())
+                    with self.spans.span("round_trip", server=server_name, tool=tool_name):
+                        result = await asyncio.wait_for(session.call_tool(tool_name, arguments), remaining)
+            except (*TRANSPORT_ERRORS, asyncio.TimeoutError) as e:
+                breaker.record_failure()
+                state["timed_out"] = isinstance(e, asyncio.TimeoutError)
+                if server_name in self.mcp_clients:
+                    # The server went away or is stuck; reconnect on the next call
+                    await self._drop_client(server_name)
+                if not self._should_retry(e, state["attempts"]):
+                    raise
+                delay = self.retry_policy.delay(state["attempts"])
+                print(f"[MCP] Retrying '{tool_name}' in {delay:.2f}s after: {str(e) or type(e).__name__}")
+                await asyncio.sleep(delay)
+                continue
+            breaker.record_success()
+            return result
+    
+    @staticmethod
+    def _error_message(error: Exception, timeout: Optional[float]) -> str:
+        if isinstance(error, asyncio.TimeoutError):
+            return f"Timed out after {timeout}s"
+        return str(error)
+    
     async def execute_step_async(self, step: PlanStep) -> Dict[str, Any]:
-        """Execute a single workflow step using async MCP client"""
+        """Execute a single workflow step using async MCP client.
+        
+        Each call is bounded by timeout_for(step). Transport failures (and
+        timeouts, if the retry policy says so) are retried with jittered
+        backoff; they also count against the server's circuit breaker, which
+        fails calls fast while open. Cancelling the step cancels the call.
+        
+        Results of read-only tools come from result_cache when possible, or
+        from a speculative or step call already fetching them, so identical
+        concurrent calls reach the server once.
+        """
         step.start_execution()
         start_time = time.time()
+        state = {"attempts": 0, "timed_out": False}
+        timeout = self.timeout_for(step)
+        cache_key = None
         try:
             print(f"[MCP] Executing tool '{step.tool_name}' (server={step.server_name})")
+            with self.spans.span("serialize", tool=step.tool_name):
+                # Outputs of earlier steps are passed in memory
+                arguments = step.resolved_parameters()
+                if self.result_cache.enabled and self.is_cacheable(step.server_name, step.tool_name):
+                    cache_key = self.result_cache.make_key(step.server_name, step.tool_name, arguments)
             
-            # Connect to MCP server if needed
-            client = await self.connect_to_mcp_server(step.server_name)
-            
-            if not client:
-                raise ValueError(f"Could not connect to MCP server: {step.server_name}")
+            if cache_key is not None:
+                result = self.result_cache.get(cache_key)
+                pending = self._prefetching.get(cache_key) or self._in_flight.get(cache_key)
+                if result is None and pending is not None:
+                    # A speculative call or another step is already fetching this result;
+                    # if it fails or is cancelled, this step makes the call itself
+                    await asyncio.wait([pending])
+                    if not pending.cancelled() and pending.exception() is None:
+                        result = pending.result()
+                if result is not None:
+                    step.mark_completed(result)
+                    return {
+                        "step_id": step.step_id,
+                        "success": True,
+                        "result": result,
+                        "duration": time.time() - start_time,
+                        "attempts": 0,
+                        "cached": True
+                    }
             
-            # Get session and call the tool using the async MCP client
-            session = await client.get_session()
-            result = await session.call_tool(step.tool_name, step.parameters or {})
+            if cache_key is None:
+                result = await self._call_tool(step.server_name, step.tool_name, arguments, timeout, state)
+            else:
+                call = asyncio.ensure_future(
+                    self._call_tool(step.server_name, step.tool_name, arguments, timeout, state))
+                self._in_flight[cache_key] = call
+                try:
+                    result = await call
+                finally:
+                    if self._in_flight.get(cache_key) is call:
+                        del self._in_flight[cache_key]
             
+            with self.spans.span("decode", tool=step.tool_name):
+                if cache_key is not None and not getattr(result, "isError", False):
+                    self.result_cache.put(cache_key, result)
+                step.mark_completed(result)
             duration = time.time() - start_time
-            step.mark_completed(result)
             return {
                 "step_id": step.step_id,
                 "success": True,
                 "result": result,
-                "duration": duration
+                "duration": duration,
+                "attempts": state["attempts"]
             }
+        except asyncio.CancelledError:
+            step.mark_cancelled()
+            raise
         except Exception as e:
             duration = time.time() - start_time
-            step.mark_failed(str(e))
+            error = self._error_message(e, timeout)
+            step.mark_failed(error)
             return {
                 "step_id": step.step_id,
                 "success": False,
-                "error": str(e),
-                "duration": duration
+                "error": error,
+                "duration": duration,
+                "attempts": state["attempts"],
+                "timed_out": state["timed_out"]
             }
     
     def execute_step(self, step: PlanStep) -> Dict[str, Any]:
-        """Execute a single workflow step, using async method with event loop"""
+        """Execute a single workflow step on the executor runtime loop"""
         try:
-            # Run the async method in an event loop
-            return asyncio.run(self.execute_step_async(step))
+            return self.runtime.run(self.execute_step_async(step))
         except Exception as e:
             step.mark_failed(str(e))
             return {
@@ -94,48 +371,319 @@ class WorkflowExecutor:
                 "duration": 0
             }
     
+    async def execute_batch_async(self, server_name: str, calls: List[Tuple[str, Dict[str, Any]]],
+                                  max_concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Run many (tool, arguments) calls on one server; results come back in call order.
+        
+        Read-only results come from result_cache when possible. The other calls
+        go to the server's batch_call_tool, batch_size at a time, when the
+        server has one, and otherwise as separate calls over pooled sessions.
+        Either way at most max_concurrency calls run at once. Each item is
+        {"tool", "success", "result" | "error"}; one failed call does not fail
+        the others.
+        """
+        limit = max(1, max_concurrency or self.max_parallel_per_server)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(calls)
+        pending = []  # (index, tool, arguments, cache key)
+        for index, (tool, arguments) in enumerate(calls):
+            arguments = arguments or {}
+            cache_key = None
+            if self.result_cache.enabled and self.is_cacheable(server_name, tool):
+                cache_key = self.result_cache.make_key(server_name, tool, arguments)
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    results[index] = {"tool": tool, "success": True, "result": cached, "cached": True}
+                    continue
+            pending.append((index, tool, arguments, cache_key))
+        
+        if pending and self.supports_batch(server_name):
+            for start in range(0, len(pending), self.batch_size):
+                await self._run_batch_chunk(server_name, pending[start:start + self.batch_size], limit, results)
+        elif pending:
+            semaphore = asyncio.Semaphore(limit)
+            
+            async def run_single(index: int, tool: str, arguments: Dict[str, Any], cache_key):
+                timeout = self._timeout(server_name, tool)
+                async with semaphore:
+                    try:
+                        result = await self._call_tool(server_name, tool, arguments, timeout,
+                                                       {"attempts": 0, "timed_out": False})
+                    except Exception as e:
+                        results[index] = {"tool": tool, "success": False, "error": self._error_message(e, timeout)}
+                        return
+                if cache_key is not None and not getattr(result, "isError", False):
+                    self.result_cache.put(cache_key, result)
+                results[index] = {"tool": tool, "success": True, "result": result}
+            
+            await asyncio.gather(*(run_single(*call) for call in pending))
+        return results
+    
+    async def _run_batch_chunk(self, server_name: str, chunk: List[tuple], limit: int,
+                               results: List[Optional[Dict[str, Any]]]):
+        timeout = self._timeout(server_name, BATCH_TOOL_NAME)
+        if timeout:
+            timeout *= math.ceil(len(chunk) / limit)  # One call's deadline per round of concurrent calls
+        arguments = {
+            "calls": [{"tool": tool, "arguments": arguments} for _, tool, arguments, _ in chunk],
+            "max_concurrency": limit,
+        }
+        try:
+            result = await self._call_tool(server_name, BATCH_TOOL_NAME, arguments, timeout,
+                                           {"attempts": 0, "timed_out": False})
+            with self.spans.span("decode", tool=BATCH_TOOL_NAME, calls=len(chunk)):
+                items = decode_batch_result(result)
+        except Exception as e:
+            error = self._error_message(e, timeout)
+            for index, tool, _, _ in chunk:
+                results[index] = {"tool": tool, "success": False, "error": error}
+            return
+        for (index, tool, _, cache_key), item in zip(chunk, items):
+            if item.get("success"):
+                if cache_key is not None:
+                    self.result_cache.put(cache_key, item["result"])
+                results[index] = {"tool": tool, "success": True, "result": item["result"]}
+            else:
+                results[index] = {"tool": tool, "success": False, "error": item.get("error", "")}
+    
+    def execute_batch(self, server_name: str, calls: List[Tuple[str, Dict[str, Any]]],
+                      max_concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Run a batch of tool calls on the executor runtime loop"""
+        try:
+            return self.runtime.run(self.execute_batch_async(server_name, calls, max_concurrency))
+        except Exception as e:
+            return [{"tool": tool, "success": False, "error": f"Async execution error: {str(e)}"}
+                    for tool, _ in calls]
+    
     async def execute_workflow_async(self, plan: WorkflowPlan) -> Dict[str, Any]:
-        """Execute a complete workflow asynchronously"""
+        """Execute a complete workflow asynchronously.
+        
+        Steps run as a DAG: every ready step is started as soon as its
+        dependencies complete (in a plan that is not parallel, steps added
+        without dependencies wait for the previous step), bounded by
+        max_parallel_steps overall and by max_parallel_per_server for each MCP
+        server. Invocations are traced in completion order; results are
+        returned in plan order and carry their step_index and completion_index.
+        
+        abort_workflow(plan) stops scheduling and cancels the running steps;
+        they are reported as failed with "cancelled": True.
+        """
+        async for event in self.stream_workflow(plan):
+            if event["type"] == "workflow_completed":
+                return event["outcome"]
+    
+    def _speculation_candidates(self, plan: WorkflowPlan, skip: set) -> List[PlanStep]:
+        """Read-only steps not started yet, with known parameters, that no pending write precedes"""
+        def only_reads_pending(step: PlanStep, seen: set) -> bool:
+            for dep in step.dependencies:
+                if dep.status == StepStatus.COMPLETED or dep.step_id in seen:
+                    continue
+                seen.add(dep.step_id)
+                if not self.is_cacheable(dep.server_name, dep.tool_name) or not only_reads_pending(dep, seen):
+                    return False
+            return True
+        
+        return [step for step in plan.steps
+                if step.step_id not in skip and step.status in (StepStatus.PENDING, StepStatus.READY)
+                and step.server_name not in self.mcp_clients
+                and self.is_cacheable(step.server_name, step.tool_name)
+                and not step.references() and only_reads_pending(step, set())]
+    
+    async def _prefetch(self, step: PlanStep, cache_key: tuple, budget: asyncio.Semaphore) -> Optional[Any]:
+        """Run a read-only step's call ahead of time and cache its result"""
+        try:
+            async with budget:
+                result = await self._call_tool(step.server_name, step.tool_name, step.parameters or {},
+                                               self.timeout_for(step), {"attempts": 0, "timed_out": False})
+        except Exception:
+            return None  # The step will make the call itself
+        finally:
+            self._prefetching.pop(cache_key, None)
+        if getattr(result, "isError", False):
+            return None
+        self.result_cache.put(cache_key, result)
+        return result
+    
+    async def stream_workflow(self, plan: WorkflowPlan, max_buffered: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Execute a workflow, yielding events as they happen.
+        
+        Events are dicts with a "type":
+        - "status": a LiveTrace snapshot under "live_trace" (step started, workflow finished)
+        - "step_result": one step's result under "result", with the partial
+          "trace_analysis" and "live_trace" so far
+        - "workflow_completed": the last event; "outcome" holds what
+          execute_workflow_async returns
+        
+        At most max_buffered events wait for the consumer; past that, no new
+        step is started until the consumer catches up. Closing the iterator
+        early aborts the plan.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_buffered or self.max_parallel_steps * 2))
+        producer = asyncio.create_task(self._run_workflow(plan, queue.put))
+        finished = False
+        try:
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait([getter, producer], return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    producer.result()  # Raises what stopped the producer
+                    raise RuntimeError("Workflow ended without a final event")
+                event = getter.result()
+                if event["type"] == "workflow_completed":
+                    finished = True
+                yield event
+                if finished:
+                    break
+        finally:
+            if not producer.done():
+                if not finished:
+                    self.abort_workflow(plan)
+                producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+    
+    async def _run_workflow(self, plan: WorkflowPlan, emit: Callable[[Dict[str, Any]], Awaitable[None]]):
+        """Schedule a plan's steps, passing every event to emit"""
         session = self.registry.create_session()
         session.start()
         trace = session.create_new_trace()
+        live = session.live_trace
+        live.total_steps = len(plan.steps)
+        live.status = "running"
         
         plan.start_execution()
         results = []
+        running: Dict[asyncio.Task, PlanStep] = {}
+        global_limit = asyncio.Semaphore(self.max_parallel_steps)
+        server_limits: Dict[str, asyncio.Semaphore] = {}
+        step_index = {step.step_id: i for i, step in enumerate(plan.steps)}
+        scheduled = set()
+        abort = asyncio.Event()
+        self._aborts[plan.plan_id] = (asyncio.get_running_loop(), abort)
+        abort_wait = asyncio.create_task(abort.wait())
+        considered = set()
+        speculated: Dict[str, tuple] = {}  # step_id -> cache key of its speculative call
+        speculative_tasks: List[asyncio.Task] = []
+        speculation_budget = asyncio.Semaphore(self.max_speculative_steps)
+        
+        def speculate():
+            for step in self._speculation_candidates(plan, considered):
+                considered.add(step.step_id)
+                cache_key = self.result_cache.make_key(step.server_name, step.tool_name, step.parameters)
+                if cache_key in self.result_cache or cache_key in self._prefetching:
+                    continue
+                speculated[step.step_id] = cache_key
+                task = asyncio.create_task(self._prefetch(step, cache_key, speculation_budget))
+                self._prefetching[cache_key] = task
+                speculative_tasks.append(task)
+                self.speculation_stats["launched"] += 1
+        
+        if self.speculative:
+            # Start every server the plan needs before its first step gets there
+            for server_name in {step.server_name for step in plan.steps} - set(self.mcp_clients):
+                script_path = self._script_path(server_name) if self.registry.get_mcp_server(server_name) else None
+                if script_path:
+                    speculative_tasks.append(asyncio.create_task(
+                        self.pool.warm(script_path, 1, self._pool_size(server_name))))
+        
+        async def record(step: PlanStep, result: Dict[str, Any]):
+            with self.spans.span("trace_record", tool=step.tool_name):
+                result["step_index"] = step_index[step.step_id]
+                result["completion_index"] = len(results)
+                results.append(result)
+                
+                # Add to trace
+                invocation = MCPInvocation(
+                    tool_name=step.tool_name,
+                    server_name=step.server_name,
+                    arguments=step.serializable_parameters(),
+                    result=result.get("result", {}),
+                    success=result["success"],
+                    duration=result.get("duration"),
+                    attempts=result.get("attempts", 1),
+                    timed_out=result.get("timed_out", False)
+                )
+                trace.add_invocation(invocation)
+                live.completed_steps += 1
+                event = {
+                    "type": "step_result",
+                    "session_id": session.session_id,
+                    "result": result,
+                    "trace_analysis": trace.analyze(),
+                    "live_trace": live.to_dict()
+                }
+            await emit(event)
+        
+        async def run_bounded(step: PlanStep) -> Dict[str, Any]:
+            server_limit = server_limits.setdefault(
+                step.server_name, asyncio.Semaphore(self.max_parallel_per_server))
+            # Wait for the server first: a step queued behind a busy server must not
+            # hold a global slot that a step for an idle server could use
+            async with server_limit, global_limit:
+                live.current_step = step.tool_name
+                await emit({"type": "status", "session_id": session.session_id, "live_trace": live.to_dict()})
+                return await self.execute_step_async(step)
+        
+        async def finish(outcome: Dict[str, Any]):
+            live.current_step = None
+            live.status = outcome["status"]
+            await emit({"type": "status", "session_id": session.session_id, "live_trace": live.to_dict()})
+            await emit({"type": "workflow_completed", "session_id": session.session_id, "outcome": outcome})
         
         try:
-            while not plan.check_completion():
-                ready_steps = plan.get_ready_steps()
+            while plan.status != PlanStatus.CANCELLED:
+                for step in plan.get_ready_steps():
+                    if step.step_id not in scheduled:
+                        scheduled.add(step.step_id)
+                        running[asyncio.create_task(run_bounded(step))] = step
+                if self.speculative and self.result_cache.enabled:
+                    speculate()
                 
-                if not ready_steps:
+                if not running:
                     break  # No more steps to execute
                 
-                for step in ready_steps:
-                    result = await self.execute_step_async(step)
-                    results.append(result)
-                    
-                    # Add to trace
-                    invocation = MCPInvocation(
-                        tool_name=step.tool_name,
-                        server_name=step.server_name,
-                        arguments=step.parameters,
-                        result=result.get("result", {}),
-                        success=result["success"]
-                    )
-                    trace.add_invocation(invocation)
+                done, _ = await asyncio.wait([*running, abort_wait], return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is not abort_wait:
+                        await record(running.pop(task), task.result())
                 
+                # Re-evaluate readiness now that dependencies have finished
                 plan._update_step_readiness()
             
-            session.end()
-            return {
+            if running:
+                # Aborted: cancel in-flight steps and report them
+                for task in running:
+                    task.cancel()
+                await asyncio.gather(*running, return_exceptions=True)
+                for task, step in list(running.items()):
+                    if task.cancelled():
+                        step.mark_cancelled()
+                        started = step.start_time or step.end_time
+                        await record(step, {
+                            "step_id": step.step_id,
+                            "success": False,
+                            "error": "cancelled",
+                            "cancelled": True,
+                            "duration": (step.end_time - started).total_seconds()
+                        })
+                    else:
+                        await record(step, task.result())
+                running.clear()
+            
+            plan.check_completion()
+            session.end("cancelled" if plan.status == PlanStatus.CANCELLED else "completed")
+            results.sort(key=lambda r: r["step_index"])
+            outcome = {
                 "session_id": session.session_id,
                 "status": plan.status.value,
                 "results": results,
                 "trace_analysis": trace.analyze()
             }
+        except asyncio.CancelledError:
+            session.end("cancelled")
+            raise
         except Exception as e:
             session.end()
-            return {
+            outcome = {
                 "session_id": session.session_id,
                 "status": "error",
                 "error": str(e),
@@ -143,14 +691,39 @@ class WorkflowExecutor:
                 "trace_analysis": trace.analyze()
             }
         finally:
-            # Clean up MCP clients
-            await self.cleanup_mcp_clients()
+            self._aborts.pop(plan.plan_id, None)
+            abort_wait.cancel()
+            for task in speculative_tasks:
+                task.cancel()
+            if speculative_tasks:
+                await asyncio.gather(*speculative_tasks, return_exceptions=True)
+            # Speculative results the plan did not use (cancelled or failed
+            # steps, inputs changed since) are thrown away
+            served = {r["step_id"] for r in results if r.get("cached")}
+            for step_id, cache_key in speculated.items():
+                if step_id in served:
+                    self.speculation_stats["used"] += 1
+                elif self.result_cache.discard(cache_key):
+                    self.speculation_stats["discarded"] += 1
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+        await finish(outcome)
+    
+    def abort_workflow(self, plan: WorkflowPlan) -> bool:
+        """Abort a plan and cancel its running steps; safe to call from any thread"""
+        aborted = plan.abort()
+        entry = self._aborts.get(plan.plan_id)
+        if entry is not None:
+            loop, abort = entry
+            loop.call_soon_threadsafe(abort.set)
+        return aborted
     
     def execute_workflow(self, plan: WorkflowPlan) -> Dict[str, Any]:
-        """Execute a complete workflow"""
+        """Execute a complete workflow on the executor runtime loop"""
         try:
-            # Run the async method in an event loop
-            return asyncio.run(self.execute_workflow_async(plan))
+            return self.runtime.run(self.execute_workflow_async(plan))
         except Exception as e:
             return {
                 "status": "error",
@@ -160,10 +733,19 @@ class WorkflowExecutor:
     
     async def cleanup_mcp_clients(self):
         """Clean up all MCP clients"""
-        for server_name, client in self.mcp_clients.items():
+        for server_name, client in list(self.mcp_clients.items()):
+            print(f"Cleaning up MCP client for {server_name}")
+            await self._drop_client(server_name)
+        self.mcp_clients = {}
+        self._connect_locks = {}
+        self._clients_loop = None
+        await self.pool.close()
+    
+    def shutdown(self):
+        """Close every MCP session and stop the runtime loop"""
+        if self.runtime.running:
             try:
-                print(f"Cleaning up MCP client for {server_name}")
-                await client.cleanup()
+                self.runtime.run(self.cleanup_mcp_clients())
             except Exception as e:
-                print(f"Error cleaning up MCP client for {server_name}: {str(e)}")
-        self.mcp_clients = {}
+                print(f"Error shutting down MCP clients: {str(e)}")
+        self.runtime.stop()
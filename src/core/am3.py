@@ -1,53 +1,79 @@
+import sys
 from dataclasses import dataclass, field
 from typing import Optional, List
 from enum import Enum
 
-@dataclass
+# Megamodel classes are slotted: large registries hold hundreds of thousands
+# of them, and a per-instance __dict__ dominates their footprint.
+
+def lazy_dict_slot(cls: type, name: str) -> type:
+    """Make the dict stored in slot `name` allocate on first access.
+    
+    The field defaults to None so instances that never touch it carry no
+    dict; reading it returns (and stores) a fresh one.
+    """
+    slot = cls.__dict__[name]
+    
+    def get(self):
+        value = slot.__get__(self, cls)
+        if value is None:
+            value = {}
+            slot.__set__(self, value)
+        return value
+    
+    setattr(cls, name, property(get, slot.__set__))
+    return cls
+
+@dataclass(slots=True)
 class Entity:
     """Base entity in the AM3 megamodel"""
     uri: str
     name: str = ""
-    metadata: dict = field(default_factory=dict)
+    metadata: Optional[dict] = None  # Allocated on first access
     
     #If the name is not provided , we set the last part of the uri.
     def __post_init__(self):
         if not self.name:
             self.name = self.uri.split('/')[-1] if '/' in self.uri else self.uri
 
-@dataclass
+lazy_dict_slot(Entity, "metadata")
+
+@dataclass(slots=True)
 class Relationship:
     """Represents relationships between entities"""
     source: Entity
     target: Entity
     relationship_type: str = "conformsTo"
-    # gets its own independent empty dictionary (not shared across instances).
-    properties: dict = field(default_factory=dict)
+    # Allocated on first access, then independent per instance.
+    properties: Optional[dict] = None
+    
+    def __post_init__(self):
+        self.relationship_type = sys.intern(self.relationship_type)
+
+lazy_dict_slot(Relationship, "properties")
 
 class ModelType(Enum):
     REFERENCE = "reference"
     TRANSFORMATION = "transformation" 
     TERMINAL = "terminal"
 
-@dataclass
+@dataclass(slots=True)
 class Model(Entity):
     """Base model class"""
     conformsTo: Optional['Model'] = None
     model_type: ModelType = ModelType.TERMINAL
     content_path: Optional[str] = None
-    
-    def __post_init__(self):
-        super().__post_init__()
 
-@dataclass
+@dataclass(slots=True)
 class ReferenceModel(Model):
     """Metamodel definition (e.g., .ecore files)"""
     metamodel_content: Optional[str] = None
     
     def __post_init__(self):
-        super().__post_init__()
+        super(ReferenceModel, self).__post_init__()
         self.model_type = ModelType.REFERENCE
 
-@dataclass
+@dataclass(slots=True)
 class TransformationModel(Model):
     """Model transformation definition (e.g., .atl files)"""
     source_metamodel: Optional[ReferenceModel] = None
@@ -57,19 +83,19 @@ class TransformationModel(Model):
     sample_sources: List[str] = field(default_factory=list)
     
     def __post_init__(self):
-        super().__post_init__()
+        super(TransformationModel, self).__post_init__()
         self.model_type = ModelType.TRANSFORMATION
 
-@dataclass
+@dataclass(slots=True)
 class TerminalModel(Model):
     """Concrete model instance (e.g., .xmi files)"""
     instance_data: Optional[dict] = None
     
     def __post_init__(self):
-        super().__post_init__()
+        super(TerminalModel, self).__post_init__()
         self.model_type = ModelType.TERMINAL
 
-@dataclass
+@dataclass(slots=True)
 class DirectedRelationship(Relationship):
     """Directed relationship with specific semantics"""
     direction: str = "forward"
@@ -19,12 +19,54 @@ class SystemConfig:
     log_level: str = "INFO"
     max_parallel_steps: int = 3
     default_timeout: int = 30
+    megamodel_snapshot_path: str = ""
+    max_sessions: int = 1000
+    max_session_age: float = 0
+    max_workflow_plans: int = 1000
+    trace_store_path: str = ""
+    mcp_health_check_interval: float = 30
+    mcp_pool_size: int = 3
+    max_retries: int = 2
+    retry_backoff: float = 0.5
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout: float = 30
+    tool_cache_size: int = 512
+    tool_cache_ttl: float = 300
+    tool_batch_size: int = 100
+    speculative_prefetch: bool = False
+    executor_spans: bool = True
+    max_spans: int = 100000
+    embedding_cache_path: str = ""
+    embedding_cache_size: int = 50000
+    retrieval_cache_size: int = 256
+    rag_offline: bool = False
     
     def __post_init__(self):
         # Load from environment variables if available
         self.log_level = os.getenv("LOG_LEVEL", self.log_level)
         self.max_parallel_steps = int(os.getenv("MAX_PARALLEL_STEPS", str(self.max_parallel_steps)))
         self.default_timeout = int(os.getenv("DEFAULT_TIMEOUT", str(self.default_timeout)))
+        self.megamodel_snapshot_path = os.getenv("MEGAMODEL_SNAPSHOT_PATH", self.megamodel_snapshot_path)
+        self.max_sessions = int(os.getenv("MAX_SESSIONS", str(self.max_sessions)))
+        self.max_session_age = float(os.getenv("MAX_SESSION_AGE", str(self.max_session_age)))
+        self.max_workflow_plans = int(os.getenv("MAX_WORKFLOW_PLANS", str(self.max_workflow_plans)))
+        self.trace_store_path = os.getenv("TRACE_STORE_PATH", self.trace_store_path)
+        self.mcp_health_check_interval = float(os.getenv("MCP_HEALTH_CHECK_INTERVAL", str(self.mcp_health_check_interval)))
+        self.mcp_pool_size = int(os.getenv("MCP_POOL_SIZE", str(self.mcp_pool_size)))
+        self.max_retries = int(os.getenv("MAX_RETRIES", str(self.max_retries)))
+        self.retry_backoff = float(os.getenv("RETRY_BACKOFF", str(self.retry_backoff)))
+        self.circuit_failure_threshold = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", str(self.circuit_failure_threshold)))
+        self.circuit_reset_timeout = float(os.getenv("CIRCUIT_RESET_TIMEOUT", str(self.circuit_reset_timeout)))
+        self.tool_cache_size = int(os.getenv("TOOL_CACHE_SIZE", str(self.tool_cache_size)))
+        self.tool_cache_ttl = float(os.getenv("TOOL_CACHE_TTL", str(self.tool_cache_ttl)))
+        self.tool_batch_size = int(os.getenv("TOOL_BATCH_SIZE", str(self.tool_batch_size)))
+        self.speculative_prefetch = os.getenv("SPECULATIVE_PREFETCH", str(self.speculative_prefetch)).lower() in ("1", "true", "yes")
+        self.executor_spans = os.getenv("EXECUTOR_SPANS", str(self.executor_spans)).lower() in ("1", "true", "yes")
+        self.max_spans = int(os.getenv("MAX_SPANS", str(self.max_spans)))
+        self.embedding_cache_path = os.getenv("EMBEDDING_CACHE_PATH", self.embedding_cache_path)
+        self.embedding_cache_size = int(os.getenv("EMBEDDING_CACHE_SIZE", str(self.embedding_cache_size)))
+        self.retrieval_cache_size = int(os.getenv("RETRIEVAL_CACHE_SIZE", str(self.retrieval_cache_size)))
+        self.rag_offline = os.getenv("RAG_OFFLINE", str(self.rag_offline)).lower() in ("1", "true", "yes")
 
 # Global configuration instance
 config = SystemConfig()
@@ -0,0 +1,389 @@
+"""
+Megamodel Indexes - Hash indexes backing MegamodelRegistry lookups
+"""
+from typing import Dict, List, Optional, Iterator, Tuple, Any, Set
+from collections import deque
+from src.core.am3 import Entity, Relationship, Model, TransformationModel
+
+
+class EntityTypeIndex:
+    """Class-hierarchy-aware index of entities by type.
+
+    Each entity is filed under every class of its MRO, so a lookup for a
+    base class such as ``Model`` is a single bucket read that also covers
+    ``ReferenceModel``, ``TransformationModel`` and ``TerminalModel``.
+    """
+
+    def __init__(self):
+        self._by_class: Dict[type, Dict[str, Entity]] = {}
+        self._classes_by_uri: Dict[str, Tuple[type, ...]] = {}
+
+    @staticmethod
+    def _classes_of(entity: Entity) -> Tuple[type, ...]:
+        return tuple(cls for cls in type(entity).__mro__ if cls is not object)
+
+    def add(self, entity: Entity) -> None:
+        """Index an entity, replacing any entity previously stored under its URI"""
+        uri = entity.uri
+        new_classes = self._classes_of(entity)
+        old_classes = self._classes_by_uri.get(uri, ())
+        for cls in old_classes:
+            if cls not in new_classes:
+                self._discard(cls, uri)
+        for cls in new_classes:
+            # Assigning over an existing key keeps its position in the bucket
+            self._by_class.setdefault(cls, {})[uri] = entity
+        self._classes_by_uri[uri] = new_classes
+
+    def remove(self, uri: str) -> bool:
+        """Drop the entity stored under a URI, returning False if none was"""
+        classes = self._classes_by_uri.pop(uri, None)
+        if classes is None:
+            return False
+        for cls in classes:
+            self._discard(cls, uri)
+        return True
+
+    def _discard(self, cls: type, uri: str) -> None:
+        bucket = self._by_class.get(cls)
+        if bucket is not None:
+            bucket.pop(uri, None)
+            if not bucket:
+                del self._by_class[cls]
+
+    def find(self, entity_type: type) -> Optional[List[Entity]]:
+        """Return entities that are instances of entity_type.
+
+        Returns None when the answer cannot be read from the index, i.e. when
+        entity_type only matches registered classes through virtual
+        subclassing (ABC registration); callers should then scan.
+        """
+        bucket = self._by_class.get(entity_type)
+        if bucket is not None:
+            return list(bucket.values())
+        if not isinstance(entity_type, type):
+            return None
+        for cls in self._by_class:
+            if issubclass(cls, entity_type):
+                return None
+        return []
+
+    def clear(self) -> None:
+        """Drop all entities"""
+        self._by_class.clear()
+        self._classes_by_uri.clear()
+
+
+class ModelIndex:
+    """Index of models by (metamodel URI, model type).
+
+    Models are keyed by URI inside each bucket, so registering the same URI
+    twice replaces the entry instead of duplicating it. The metamodel key is
+    taken from ``conformsTo`` at registration time; re-register a model after
+    changing what it conforms to.
+    """
+
+    def __init__(self):
+        self._by_key: Dict[Tuple[Optional[str], Optional[str]], Dict[str, Model]] = {}
+        self._keys_by_uri: Dict[str, Tuple[Optional[str], str]] = {}
+
+    @staticmethod
+    def _key_of(model: Model) -> Tuple[Optional[str], str]:
+        conforms_to = getattr(model, "conformsTo", None)
+        metamodel_uri = getattr(conforms_to, "uri", None) if conforms_to else None
+        return (metamodel_uri, model.model_type.value)
+
+    @staticmethod
+    def _bucket_keys(key: Tuple[Optional[str], str]) -> List[Tuple[Optional[str], Optional[str]]]:
+        metamodel_uri, model_type = key
+        keys = [(None, model_type)]
+        if metamodel_uri is not None:
+            keys += [(metamodel_uri, model_type), (metamodel_uri, None)]
+        return keys
+
+    def add(self, model: Model) -> None:
+        """Index a model, replacing any model previously stored under its URI"""
+        uri = model.uri
+        key = self._key_of(model)
+        old_key = self._keys_by_uri.get(uri)
+        if old_key is not None and old_key != key:
+            self.remove(uri)
+        for bucket_key in self._bucket_keys(key):
+            self._by_key.setdefault(bucket_key, {})[uri] = model
+        self._keys_by_uri[uri] = key
+
+    def remove(self, uri: str) -> bool:
+        """Drop the model stored under a URI, returning False if none was"""
+        key = self._keys_by_uri.pop(uri, None)
+        if key is None:
+            return False
+        for bucket_key in self._bucket_keys(key):
+            bucket = self._by_key.get(bucket_key)
+            if bucket is not None:
+                bucket.pop(uri, None)
+                if not bucket:
+                    del self._by_key[bucket_key]
+        return True
+
+    def find(self, metamodel_uri: Optional[str] = None, model_type: Optional[str] = None) -> List[Model]:
+        """Return models conforming to metamodel_uri and/or of model_type.
+
+        At least one criterion must be given; use the entity type index to
+        list every model.
+        """
+        if metamodel_uri is None and model_type is None:
+            raise ValueError("ModelIndex.find needs a metamodel URI or a model type")
+        bucket = self._by_key.get((metamodel_uri, model_type))
+        return list(bucket.values()) if bucket else []
+
+    def clear(self) -> None:
+        """Drop all models"""
+        self._by_key.clear()
+        self._keys_by_uri.clear()
+
+
+class TransformationGraph:
+    """Adjacency index: metamodel URI -> transformations consuming it -> produced metamodel.
+
+    Transformations are edges from their source metamodel to their target
+    metamodel. Path queries walk this adjacency, so their cost follows the
+    edges visited instead of comparing every pair of transformations.
+    Chains are lists of TransformationModel, in application order.
+    """
+
+    def __init__(self):
+        self._consumers: Dict[str, Dict[str, TransformationModel]] = {}
+        self._producers: Dict[str, Dict[str, TransformationModel]] = {}
+        self._edges: Dict[str, Tuple[str, str]] = {}
+
+    @staticmethod
+    def _endpoints(transformation: TransformationModel) -> Optional[Tuple[str, str]]:
+        source = getattr(transformation.source_metamodel, "uri", None)
+        target = getattr(transformation.target_metamodel, "uri", None)
+        if source is None or target is None:
+            return None
+        return (source, target)
+
+    def add(self, transformation: TransformationModel) -> None:
+        """Index a transformation, replacing any previously stored under its URI"""
+        self.remove(transformation.uri)
+        endpoints = self._endpoints(transformation)
+        if endpoints is None:
+            return
+        self._consumers.setdefault(endpoints[0], {})[transformation.uri] = transformation
+        self._producers.setdefault(endpoints[1], {})[transformation.uri] = transformation
+        self._edges[transformation.uri] = endpoints
+
+    def remove(self, uri: str) -> bool:
+        """Drop the transformation stored under a URI, returning False if none was"""
+        endpoints = self._edges.pop(uri, None)
+        if endpoints is None:
+            return False
+        for index, key in ((self._consumers, endpoints[0]), (self._producers, endpoints[1])):
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.pop(uri, None)
+                if not bucket:
+                    del index[key]
+        return True
+
+    def consumers(self, metamodel_uri: str) -> List[TransformationModel]:
+        """Transformations whose source metamodel is metamodel_uri"""
+        bucket = self._consumers.get(metamodel_uri)
+        return list(bucket.values()) if bucket else []
+
+    def successors(self, metamodel_uri: str) -> List[Tuple[TransformationModel, str]]:
+        """(transformation, produced metamodel URI) pairs leaving metamodel_uri"""
+        bucket = self._consumers.get(metamodel_uri)
+        if not bucket:
+            return []
+        return [(t, self._edges[uri][1]) for uri, t in bucket.items()]
+
+    def reachable(self, source_uri: str, max_hops: Optional[int] = None) -> Dict[str, int]:
+        """Breadth-first search: metamodel URI -> fewest hops from source_uri"""
+        distances = {source_uri: 0}
+        queue = deque([source_uri])
+        while queue:
+            current = queue.popleft()
+            hops = distances[current]
+            if max_hops is not None and hops >= max_hops:
+                continue
+            for _, target in self.successors(current):
+                if target not in distances:
+                    distances[target] = hops + 1
+                    queue.append(target)
+        return distances
+
+    def shortest_path(self, source_uri: str, target_uri: str,
+                      max_hops: Optional[int] = None) -> Optional[List[TransformationModel]]:
+        """Fewest-hop chain from source_uri to target_uri, or None"""
+        paths = self.k_shortest_paths(source_uri, target_uri, 1, max_hops)
+        return paths[0] if paths else None
+
+    def k_shortest_paths(self, source_uri: str, target_uri: str, k: int,
+                         max_hops: Optional[int] = None) -> List[List[TransformationModel]]:
+        """Up to k simple chains from source_uri to target_uri, shortest first.
+
+        Partial chains are expanded breadth-first, so complete chains come
+        out in non-decreasing length and the search stops after the k-th.
+        Metamodels that cannot reach the target are pruned up front.
+        """
+        if k <= 0:
+            return []
+        remaining = self._hops_to(target_uri, max_hops)
+        if source_uri not in remaining:
+            return []
+        results: List[List[TransformationModel]] = []
+        queue = deque([(source_uri, [], {source_uri})])
+        while queue:
+            current, chain, visited = queue.popleft()
+            for transformation, produced in self.successors(current):
+                if produced not in remaining or produced in visited and produced != target_uri:
+                    continue
+                extended = chain + [transformation]
+                if max_hops is not None and len(extended) + remaining[produced] > max_hops:
+                    continue
+                if produced == target_uri:
+                    results.append(extended)
+                    if len(results) >= k:
+                        return results
+                    continue
+                queue.append((produced, extended, visited | {produced}))
+        return results
+
+    def all_paths(self, source_uri: str, target_uri: str, max_hops: int) -> List[List[TransformationModel]]:
+        """Every simple chain from source_uri to target_uri of at most max_hops transformations"""
+        remaining = self._hops_to(target_uri, max_hops)
+        results: List[List[TransformationModel]] = []
+        if source_uri not in remaining:
+            return results
+
+        def extend(current: str, chain: List[TransformationModel], visited: Set[str]):
+            for transformation, produced in self.successors(current):
+                if produced not in remaining or produced in visited and produced != target_uri:
+                    continue
+                if len(chain) + 1 + remaining[produced] > max_hops:
+                    continue
+                if produced == target_uri:
+                    results.append(chain + [transformation])
+                    continue
+                visited.add(produced)
+                extend(produced, chain + [transformation], visited)
+                visited.discard(produced)
+
+        extend(source_uri, [], {source_uri})
+        return results
+
+    def _hops_to(self, target_uri: str, max_hops: Optional[int]) -> Dict[str, int]:
+        """Reverse BFS: metamodel URI -> fewest hops needed to reach target_uri"""
+        distances = {target_uri: 0}
+        queue = deque([target_uri])
+        while queue:
+            current = queue.popleft()
+            hops = distances[current]
+            if max_hops is not None and hops >= max_hops:
+                continue
+            for uri in self._producers.get(current, {}):
+                source = self._edges[uri][0]
+                if source not in distances:
+                    distances[source] = hops + 1
+                    queue.append(source)
+        return distances
+
+    def clear(self) -> None:
+        """Drop all transformations"""
+        self._consumers.clear()
+        self._producers.clear()
+        self._edges.clear()
+
+
+class RelationshipIndex:
+    """Relationship store indexed by source URI, target URI and type.
+
+    Every relationship is filed under each combination of its
+    (source, target, type) keys, so inserts and removals touch a fixed
+    number of buckets and a lookup only reads the bucket matching the
+    criteria given. Buckets are insertion-ordered dicts keyed by object
+    id, which keeps results in registration order.
+    """
+
+    # Which key components each index covers, as (source, target, type) flags
+    _INDEX_KEYS = [
+        (True, False, False),
+        (False, True, False),
+        (False, False, True),
+        (True, True, False),
+        (True, False, True),
+        (False, True, True),
+        (True, True, True),
+    ]
+
+    def __init__(self):
+        self._relationships: Dict[int, Relationship] = {}
+        self._keys: Dict[int, Tuple[str, str, str]] = {}
+        self._indexes: Dict[Tuple[bool, bool, bool], Dict[Tuple, Dict[int, Relationship]]] = {
+            flags: {} for flags in self._INDEX_KEYS
+        }
+
+    @staticmethod
+    def _key_of(relationship: Relationship) -> Tuple[str, str, str]:
+        source = getattr(relationship.source, "uri", None)
+        target = getattr(relationship.target, "uri", None)
+        return (source, target, relationship.relationship_type)
+
+    @staticmethod
+    def _project(key: Tuple[Any, Any, Any], flags: Tuple[bool, bool, bool]) -> Tuple:
+        return tuple(part for part, used in zip(key, flags) if used)
+
+    def add(self, relationship: Relationship) -> None:
+        """Insert a relationship (no-op if this exact object is already stored)"""
+        rel_id = id(relationship)
+        if rel_id in self._relationships:
+            return
+        key = self._key_of(relationship)
+        self._relationships[rel_id] = relationship
+        self._keys[rel_id] = key
+        for flags, index in self._indexes.items():
+            index.setdefault(self._project(key, flags), {})[rel_id] = relationship
+
+    def remove(self, relationship: Relationship) -> bool:
+        """Remove a relationship, returning False if it was not stored"""
+        rel_id = id(relationship)
+        if rel_id not in self._relationships:
+            return False
+        key = self._keys.pop(rel_id)
+        del self._relationships[rel_id]
+        for flags, index in self._indexes.items():
+            index_key = self._project(key, flags)
+            bucket = index.get(index_key)
+            if bucket is not None:
+                bucket.pop(rel_id, None)
+                if not bucket:
+                    del index[index_key]
+        return True
+
+    def find(self, source_uri: Optional[str] = None, target_uri: Optional[str] = None,
+             relationship_type: Optional[str] = None) -> List[Relationship]:
+        """Return relationships matching every criterion that is not None"""
+        criteria = (source_uri, target_uri, relationship_type)
+        flags = tuple(part is not None for part in criteria)
+        if not any(flags):
+            return list(self._relationships.values())
+        bucket = self._indexes[flags].get(self._project(criteria, flags))
+        return list(bucket.values()) if bucket else []
+
+    def clear(self) -> None:
+        """Drop all relationships"""
+        self._relationships.clear()
+        self._keys.clear()
+        for index in self._indexes.values():
+            index.clear()
+
+    def __contains__(self, relationship: object) -> bool:
+        return id(relationship) in self._relationships
+
+    def __iter__(self) -> Iterator[Relationship]:
+        return iter(list(self._relationships.values()))
+
+    def __len__(self) -> int:
+        return len(self._relationships)
@@ -1,40 +1,152 @@
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Callable, Iterable
+from dataclasses import dataclass
+from enum import Enum
+import os
+import json
 import uuid
-from src.agents.execution import AgentSession
-from src.core.am3 import Entity, Relationship, Model
+import pickle
+import hashlib
+import tempfile
+from collections import OrderedDict
+from datetime import datetime
+from src.agents.execution import AgentSession, ExecutionStatistics
+from src.core.am3 import Entity, Relationship, Model, ModelType, TransformationModel
+from src.core.indexes import RelationshipIndex, EntityTypeIndex, ModelIndex, TransformationGraph
+from src.core.retention import RetentionPolicy, TraceStore
 from src.agents.planning import WorkflowPlan
 
+# Bump when the snapshot payload layout changes
+SNAPSHOT_FORMAT_VERSION = 1
+
+class ChangeKind(Enum):
+    ADDED = "added"
+    REMOVED = "removed"
+    UPDATED = "updated"
+    RESET = "reset"  # Bulk replacement (e.g. snapshot load); dependents should rebuild
+
+@dataclass
+class RegistryChange:
+    """Mutation event emitted to registry subscribers"""
+    kind: ChangeKind
+    category: str  # "entity", "tool" or "registry"
+    key: str = ""  # Entity URI or tool name
+    server_name: str = ""
+    item: Any = None  # New object, or the removed one for REMOVED
+    version: int = 0  # Registry version after this change
+
 class MegamodelRegistry:
     """Central registry for the extended AM3 megamodel"""
     
-    def __init__(self):
+    _MODEL_TYPES = frozenset(t.value for t in ModelType)
+    
+    def __init__(self, retention: Optional[RetentionPolicy] = None):
     
         self.entities: Dict[str, Entity] = {}
-        self.relationships: List[Relationship] = []
+        self.relationships: RelationshipIndex = RelationshipIndex()
 
         self.mcp_servers: Dict[str, Any] = {}  # Will store MCPServer objects
         self.tools_by_server: Dict[str, List[Any]] = {}  # Will store MCPTool objects
-        self.sessions: Dict[str, Any] = {}  # Will store AgentSession objects
-        self.workflow_plans: Dict[str, Any] = {}  # Will store WorkflowPlan objects
+        self.sessions: Dict[str, Any] = OrderedDict()  # Will store AgentSession objects, least recently used first
+        self.workflow_plans: Dict[str, Any] = OrderedDict()  # Will store WorkflowPlan objects, oldest first
+        self.statistics = ExecutionStatistics()  # Running counters fed by sessions and traces
+        
+        # Sessions and plans beyond the retention limits are spilled to disk
+        self.retention = retention or RetentionPolicy.from_config()
+        self.trace_store = TraceStore(self.retention.store_path)
+        self._spilled_sessions: set = set()
+        self._spilled_plans: set = set()
         
         # Indexes for fast lookup
-        self._models_by_type: Dict[str, List[Model]] = {
-            "reference": [],
-            "transformation": [],
-            "terminal": []
-        }
+        self._entities_by_type = EntityTypeIndex()
+        self._models = ModelIndex()
+        self._transformation_graph = TransformationGraph()
+        
+        # Change notification
+        self.version = 0
+        self._listeners: List[Callable[[RegistryChange], None]] = []
+        self._notifications_muted = False
         
 
+    #  Change Events 
+    def subscribe(self, listener: Callable[[RegistryChange], None]) -> None:
+        """Call listener with a RegistryChange after every entity or tool mutation"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+    
+    def unsubscribe(self, listener: Callable[[RegistryChange], None]) -> None:
+        """Stop notifying a listener"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+    
+    def _emit(self, kind: ChangeKind, category: str, key: str = "",
+              server_name: str = "", item: Any = None) -> Optional[RegistryChange]:
+        if self._notifications_muted:
+            return None
+        self.version += 1
+        change = RegistryChange(kind=kind, category=category, key=key,
+                                server_name=server_name, item=item, version=self.version)
+        for listener in list(self._listeners):
+            try:
+                listener(change)
+            except Exception as e:
+                print(f"Registry listener failed on {kind.value} {category} {key}: {e}")
+        return change
+    
     def register_entity(self, entity: Entity) -> str:
         """Register an entity in the megamodel"""
+        self._store_entity(entity)
+        return entity.uri
+    
+    def _store_entity(self, entity: Entity) -> Optional[RegistryChange]:
+        previous = self.entities.get(entity.uri)
+        if isinstance(previous, Model) and not isinstance(entity, Model):
+            self._models.remove(entity.uri)
+        
         self.entities[entity.uri] = entity
+        self._entities_by_type.add(entity)
         
         if isinstance(entity, Model):
-            model_type = entity.model_type.value
-            if model_type in self._models_by_type:
-                self._models_by_type[model_type].append(entity)
+            self._models.add(entity)
+        if isinstance(entity, TransformationModel):
+            self._transformation_graph.add(entity)
+        elif isinstance(previous, TransformationModel):
+            self._transformation_graph.remove(entity.uri)
         
-        return entity.uri
+        kind = ChangeKind.ADDED if previous is None else ChangeKind.UPDATED
+        return self._emit(kind, "entity", entity.uri, item=entity)
+    
+    def unregister_entity(self, uri: str) -> Optional[Entity]:
+        """Remove an entity from the megamodel, returning it if it was registered"""
+        entity = self.entities.get(uri)
+        self._drop_entity(uri)
+        return entity
+    
+    def _drop_entity(self, uri: str) -> Optional[RegistryChange]:
+        entity = self.entities.pop(uri, None)
+        if entity is None:
+            return None
+        self._entities_by_type.remove(uri)
+        self._models.remove(uri)
+        self._transformation_graph.remove(uri)
+        return self._emit(ChangeKind.REMOVED, "entity", uri, item=entity)
+    
+    def sync_entities(self, entities: Iterable[Entity], entity_type: type) -> List[RegistryChange]:
+        """Make the registered entities of entity_type match the given ones.
+        
+        Only differences are applied: unknown URIs are added, URIs no longer
+        listed are removed, and entities that compare unequal are replaced.
+        """
+        changes = []
+        desired = {entity.uri: entity for entity in entities}
+        for current in self.find_entities_by_type(entity_type):
+            if current.uri not in desired:
+                changes.append(self._drop_entity(current.uri))
+        for uri, entity in desired.items():
+            current = self.entities.get(uri)
+            if current is not None and current == entity:
+                continue
+            changes.append(self._store_entity(entity))
+        return [c for c in changes if c is not None]
     
     def get_entity(self, uri: str) -> Optional[Entity]:
         """Get entity by URI"""
@@ -42,29 +154,58 @@ class MegamodelRegistry:
     
     def find_entities_by_type(self, entity_type: type) -> List[Entity]:
         """Find all entities of a specific type"""
+        indexed = self._entities_by_type.find(entity_type)
+        if indexed is not None:
+            return indexed
         return [entity for entity in self.entities.values() 
                 if isinstance(entity, entity_type)]
     
     def register_relationship(self, relationship: Relationship) -> None:
         """Register a relationship"""
-        self.relationships.append(relationship)
+        self.relationships.add(relationship)
+    
+    def unregister_relationship(self, relationship: Relationship) -> bool:
+        """Remove a relationship, returning False if it was not registered"""
+        return self.relationships.remove(relationship)
     
     def find_relationships(self, source_uri: str = None, target_uri: str = None, 
                           relationship_type: str = None) -> List[Relationship]:
         """Find relationships matching criteria"""
-        results = []
-        for rel in self.relationships:
-            if (source_uri is None or rel.source.uri == source_uri) and \
-               (target_uri is None or rel.target.uri == target_uri) and \
-               (relationship_type is None or rel.relationship_type == relationship_type):
-                results.append(rel)
-        return results
+        return self.relationships.find(source_uri, target_uri, relationship_type)
     
     
     def register_mcp_server(self, name: str, server: Any) -> None:
         """Register MCP server"""
         self.mcp_servers[name] = server
-        self.tools_by_server[name] = getattr(server, 'tools', [])
+        self.set_server_tools(name, getattr(server, 'tools', []))
+    
+    @staticmethod
+    def _tool_signature(tool: Any) -> tuple:
+        schema = getattr(tool, "inputSchema", None) or getattr(tool, "parameters", None)
+        return (getattr(tool, "description", ""), json.dumps(schema, sort_keys=True, default=str))
+    
+    def set_server_tools(self, server_name: str, tools: List[Any]) -> List[RegistryChange]:
+        """Replace a server's tool list, emitting events only for what changed.
+        
+        Tools are matched by name; a tool whose description or input schema
+        differs is reported as updated.
+        """
+        tools = list(tools or [])
+        current = {getattr(t, "name", ""): t for t in self.tools_by_server.get(server_name, [])}
+        desired = {getattr(t, "name", ""): t for t in tools}
+        self.tools_by_server[server_name] = tools
+        
+        changes = []
+        for name, tool in current.items():
+            if name not in desired:
+                changes.append(self._emit(ChangeKind.REMOVED, "tool", name, server_name, tool))
+        for name, tool in desired.items():
+            previous = current.get(name)
+            if previous is None:
+                changes.append(self._emit(ChangeKind.ADDED, "tool", name, server_name, tool))
+            elif self._tool_signature(previous) != self._tool_signature(tool):
+                changes.append(self._emit(ChangeKind.UPDATED, "tool", name, server_name, tool))
+        return [c for c in changes if c is not None]
     
     def register_mcp_server_with_script(self, name: str, server: Any, script_path: str) -> None:
         """Register MCP server with script path for async client connection"""
@@ -105,68 +246,232 @@ class MegamodelRegistry:
     #  Session & Workflow Management 
     def create_session(self, context: Dict[str, Any] = None) -> Any:
         """Create new agent session"""
-        session = AgentSession(context=context or {})
+        session = AgentSession(context=context or {}, statistics=self.statistics)
         self.sessions[session.session_id] = session
+        self.enforce_retention()
         return session
     
     def get_session(self, session_id: str) -> Optional[Any]:
-        """Get session by ID"""
-        return self.sessions.get(session_id)
+        """Get session by ID, reloading it from the trace store if it was evicted"""
+        session = self.sessions.get(session_id)
+        if session is not None:
+            self.sessions.move_to_end(session_id)
+            return session
+        if session_id not in self._spilled_sessions:
+            return None
+        session = self.trace_store.load("session", session_id)
+        if session is None:
+            return None
+        session.attach_statistics(self.statistics)
+        self._spilled_sessions.discard(session_id)
+        self.sessions[session_id] = session
+        self.enforce_retention()
+        return session
     
     def create_workflow_plan(self, goal: Any) -> Any:
         """Create workflow plan"""
         plan = WorkflowPlan(goal=goal)
         plan_id = str(uuid.uuid4())
         self.workflow_plans[plan_id] = plan
+        self.enforce_retention()
         
         return plan
     
     def get_workflow_plan(self, plan_id: str) -> Optional[Any]:
-        """Get workflow plan by ID"""
-        return self.workflow_plans.get(plan_id)
+        """Get workflow plan by ID, reloading it from the trace store if it was evicted"""
+        plan = self.workflow_plans.get(plan_id)
+        if plan is not None or plan_id not in self._spilled_plans:
+            return plan
+        plan = self.trace_store.load("plan", plan_id)
+        if plan is not None:
+            self._spilled_plans.discard(plan_id)
+            self.workflow_plans[plan_id] = plan
+            self.enforce_retention()
+        return plan
+    
+    def enforce_retention(self) -> int:
+        """Spill sessions and plans beyond the retention policy to the trace store.
+        
+        Only finished sessions are evicted: those that ended longer than
+        max_session_age ago, then the least recently used ones while more than
+        max_sessions are in memory. Plans are evicted oldest first. Returns the
+        number of objects evicted.
+        """
+        policy = self.retention
+        evicted = 0
+        
+        if policy.max_session_age > 0:
+            now = datetime.now()
+            for session_id, session in list(self.sessions.items()):
+                if session.end_time is not None and \
+                   (now - session.end_time).total_seconds() > policy.max_session_age:
+                    self._evict_session(session_id)
+                    evicted += 1
+        
+        if policy.max_sessions > 0 and len(self.sessions) > policy.max_sessions:
+            for session_id, session in list(self.sessions.items()):
+                if len(self.sessions) <= policy.max_sessions:
+                    break
+                if session.end_time is not None:
+                    self._evict_session(session_id)
+                    evicted += 1
+        
+        if policy.max_workflow_plans > 0:
+            while len(self.workflow_plans) > policy.max_workflow_plans:
+                plan_id, plan = self.workflow_plans.popitem(last=False)
+                self.trace_store.append("plan", plan_id, plan)
+                self._spilled_plans.add(plan_id)
+                evicted += 1
+        
+        return evicted
+    
+    def _evict_session(self, session_id: str) -> None:
+        session = self.sessions.pop(session_id)
+        self.trace_store.append("session", session_id, session)
+        self._spilled_sessions.add(session_id)
     
-
 
     
     def query_models(self, metamodel_uri: str = None, 
                     model_type: str = None) -> List[Model]:
         """Query models by criteria"""
-        models = []
-        
-        if model_type and model_type in self._models_by_type:
-            candidates = self._models_by_type[model_type]
-        else:
-            candidates = self.find_entities_by_type(Model)
-        
-        for model in candidates:
-            if metamodel_uri is None or \
-               (hasattr(model, 'conformsTo') and model.conformsTo and 
-                model.conformsTo.uri == metamodel_uri):
-                models.append(model)
-        
-        return models
-    
-    def get_execution_statistics(self) -> Dict[str, Any]:
-        """Get execution statistics across all sessions"""
-        total_sessions = len(self.sessions)
-        total_plans = len(self.workflow_plans)
-        
-        total_invocations = 0
-        successful_invocations = 0
-        
-        for session in self.sessions.values():
-            for trace in session.execution_traces:
-                total_invocations += len(trace.invocations)
-                successful_invocations += sum(1 for inv in trace.invocations if inv.success)
-        
-        return {
-            "total_sessions": total_sessions,
-            "total_workflow_plans": total_plans,
-            "total_invocations": total_invocations,
-            "successful_invocations": successful_invocations,
-            "success_rate": (successful_invocations / total_invocations * 100) if total_invocations > 0 else 0,
+        # Unknown model types are ignored rather than matching nothing
+        if model_type not in self._MODEL_TYPES:
+            model_type = None
+        
+        if metamodel_uri is None and model_type is None:
+            return self.find_entities_by_type(Model)
+        return self._models.find(metamodel_uri, model_type)
+    
+    #  Transformation Chains 
+    def find_transformations_from(self, metamodel_uri: str) -> List[TransformationModel]:
+        """Transformations that consume models of a metamodel"""
+        return self._transformation_graph.consumers(metamodel_uri)
+    
+    def reachable_metamodels(self, source_uri: str, max_hops: int = None) -> Dict[str, int]:
+        """Metamodels reachable from source_uri by chaining transformations, with their hop count"""
+        return self._transformation_graph.reachable(source_uri, max_hops)
+    
+    def find_transformation_chain(self, source_uri: str, target_uri: str,
+                                  max_hops: int = None) -> Optional[List[TransformationModel]]:
+        """Shortest chain of transformations turning source_uri models into target_uri models"""
+        return self._transformation_graph.shortest_path(source_uri, target_uri, max_hops)
+    
+    def find_k_shortest_transformation_chains(self, source_uri: str, target_uri: str, k: int,
+                                              max_hops: int = None) -> List[List[TransformationModel]]:
+        """Up to k transformation chains from source_uri to target_uri, shortest first"""
+        return self._transformation_graph.k_shortest_paths(source_uri, target_uri, k, max_hops)
+    
+    def find_transformation_chains(self, source_uri: str, target_uri: str,
+                                   max_hops: int = 4) -> List[List[TransformationModel]]:
+        """All simple transformation chains from source_uri to target_uri up to max_hops long"""
+        return self._transformation_graph.all_paths(source_uri, target_uri, max_hops)
+    
+    #  Snapshots 
+    @staticmethod
+    def compute_fingerprint(*sources: Any) -> str:
+        """Hash JSON-serializable source descriptions into a snapshot fingerprint"""
+        digest = hashlib.sha256()
+        for source in sources:
+            digest.update(json.dumps(source, sort_keys=True, default=str).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+    
+    def save_snapshot(self, path: str, fingerprint: str = "") -> None:
+        """Write entities, relationships, servers and tool lists to a binary snapshot.
+        
+        The snapshot is a pickle stream holding a small header (format version
+        and source fingerprint) followed by the payload, so staleness can be
+        checked without decoding the payload. Object references between
+        entities are preserved. Sessions and workflow plans are not saved.
+        """
+        header = {"version": SNAPSHOT_FORMAT_VERSION, "fingerprint": fingerprint}
+        payload = {
+            "entities": list(self.entities.values()),
+            "relationships": list(self.relationships),
+            "mcp_servers": self.mcp_servers,
+            "tools_by_server": self.tools_by_server,
+        }
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    @staticmethod
+    def read_snapshot_fingerprint(path: str) -> Optional[str]:
+        """Return the fingerprint stored in a snapshot, or None if it is unreadable or outdated"""
+        try:
+            with open(path, "rb") as f:
+                header = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if not isinstance(header, dict) or header.get("version") != SNAPSHOT_FORMAT_VERSION:
+            return None
+        return header.get("fingerprint", "")
+    
+    def load_snapshot(self, path: str, fingerprint: Optional[str] = None) -> bool:
+        """Replace the registry artifacts with a snapshot's content.
+        
+        Returns False, leaving the registry untouched, when the snapshot is
+        missing, unreadable, from another format version, or stale (its
+        fingerprint differs from the one given). Pass fingerprint=None to
+        skip the staleness check.
+        """
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, "rb") as f:
+                header = pickle.load(f)
+                if not isinstance(header, dict) or header.get("version") != SNAPSHOT_FORMAT_VERSION:
+                    return False
+                if fingerprint is not None and header.get("fingerprint") != fingerprint:
+                    return False
+                payload = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            print(f"Could not load megamodel snapshot {path}: {e}")
+            return False
+        
+        self._notifications_muted = True
+        try:
+            self.entities = {}
+            self.relationships.clear()
+            self._entities_by_type.clear()
+            self._models.clear()
+            self._transformation_graph.clear()
+            for entity in payload["entities"]:
+                self.register_entity(entity)
+            for relationship in payload["relationships"]:
+                self.register_relationship(relationship)
+            self.mcp_servers = payload["mcp_servers"]
+            self.tools_by_server = payload["tools_by_server"]
+        finally:
+            self._notifications_muted = False
+        self._emit(ChangeKind.RESET, "registry")
+        return True
+    
+    def get_execution_statistics(self, reset_window: bool = False) -> Dict[str, Any]:
+        """Get execution statistics across all sessions.
+        
+        Reads running counters maintained as invocations are traced and
+        sessions end, so the cost does not grow with the number of sessions.
+        Per-tool, per-server and latency aggregates are included, and the
+        "window" entry holds the same counters since the last window reset.
+        """
+        stats = self.statistics.snapshot(reset_window=reset_window)
+        stats.update({
+            "total_sessions": len(self.sessions) + len(self._spilled_sessions),
+            "total_workflow_plans": len(self.workflow_plans) + len(self._spilled_plans),
+            "sessions_in_memory": len(self.sessions),
             "registered_entities": len(self.entities),
             "registered_relationships": len(self.relationships),
             "active_mcp_servers": len(self.mcp_servers)
-        }
-    
\ No newline at end of file
+        })
+        return stats
@@ -0,0 +1,120 @@
+"""
+Session Retention - Bounded in-memory sessions with an append-only spill store
+"""
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from src.core.config import config
+
+@dataclass
+class RetentionPolicy:
+    """Limits on what MegamodelRegistry keeps in memory (0 means unlimited)"""
+    max_sessions: int = 1000  # In-memory sessions; least recently used finished ones are evicted
+    max_session_age: float = 0  # Seconds after a session ended before it is evicted
+    max_workflow_plans: int = 1000  # In-memory plans; oldest are evicted
+    store_path: str = ""  # Spill file; a temporary file, deleted on exit, is used when empty
+
+    @classmethod
+    def from_config(cls) -> 'RetentionPolicy':
+        """Policy from the global SystemConfig"""
+        return cls(
+            max_sessions=config.max_sessions,
+            max_session_age=config.max_session_age,
+            max_workflow_plans=config.max_workflow_plans,
+            store_path=config.trace_store_path,
+        )
+
+class TraceStore:
+    """Append-only on-disk store for evicted sessions and plans.
+
+    Records are framed as <key length><payload length><key><pickled object>
+    so the offset index can be rebuilt by skipping payloads. Storing a key
+    again appends a new record; the latest one wins. Without a path, records
+    go to a temporary file that close() (or interpreter exit) deletes.
+    """
+
+    _HEADER = struct.Struct("<IQ")
+
+    def __init__(self, path: str = ""):
+        self._path = path
+        self._offsets: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._remove_temporary: Optional[weakref.finalize] = None
+        if path and os.path.exists(path):
+            self._rebuild_index()
+
+    @property
+    def path(self) -> str:
+        if not self._path:
+            fd, self._path = tempfile.mkstemp(prefix="megamodel_traces_", suffix=".bin")
+            os.close(fd)
+            self._remove_temporary = weakref.finalize(self, _remove_quietly, self._path)
+        return self._path
+
+    @staticmethod
+    def _key(kind: str, object_id: str) -> str:
+        return f"{kind}:{object_id}"
+
+    def _rebuild_index(self):
+        with open(self._path, "rb") as f:
+            while True:
+                offset = f.tell()
+                header = f.read(self._HEADER.size)
+                if len(header) < self._HEADER.size:
+                    break
+                key_len, payload_len = self._HEADER.unpack(header)
+                key = f.read(key_len).decode("utf-8")
+                f.seek(payload_len, os.SEEK_CUR)
+                self._offsets[key] = offset
+
+    def append(self, kind: str, object_id: str, obj: Any) -> None:
+        """Write an object to the end of the store"""
+        key = self._key(kind, object_id).encode("utf-8")
+        payload = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            with open(self.path, "ab") as f:
+                offset = f.tell()
+                f.write(self._HEADER.pack(len(key), len(payload)))
+                f.write(key)
+                f.write(payload)
+            self._offsets[key.decode("utf-8")] = offset
+
+    def load(self, kind: str, object_id: str) -> Optional[Any]:
+        """Read the latest record stored for an object, or None"""
+        offset = self._offsets.get(self._key(kind, object_id))
+        if offset is None:
+            return None
+        with self._lock, open(self.path, "rb") as f:
+            f.seek(offset)
+            key_len, payload_len = self._HEADER.unpack(f.read(self._HEADER.size))
+            f.seek(key_len, os.SEEK_CUR)
+            return pickle.loads(f.read(payload_len))
+
+    def contains(self, kind: str, object_id: str) -> bool:
+        """Whether an object has been stored"""
+        return self._key(kind, object_id) in self._offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def close(self):
+        """Delete the store if it is a temporary file; a configured path is kept"""
+        with self._lock:
+            if self._remove_temporary is not None:
+                self._remove_temporary()
+                self._remove_temporary = None
+                self._path = ""
+                self._offsets.clear()
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
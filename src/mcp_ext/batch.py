@@ -0,0 +1,77 @@
+"""
+Batched Tool Calls - Many tool calls in one MCP round trip
+"""
+import asyncio
+import json
+from typing import Any, Dict, List, Tuple
+
+from mcp.types import CallToolResult
+
+BATCH_TOOL_NAME = "batch_call_tool"
+
+
+def split_batch_tool(tools: List[Any]) -> Tuple[List[Any], bool]:
+    """A server's tools without batch_call_tool, and whether it was among them.
+
+    batch_call_tool is transport plumbing rather than a capability: it must
+    not reach tool registries, retrieval indexes or prompts.
+    """
+    kept = [tool for tool in tools if getattr(tool, "name", None) != BATCH_TOOL_NAME]
+    return kept, len(kept) != len(tools)
+
+
+def _content_blocks(output: Any) -> List[Dict[str, Any]]:
+    """JSON form of what FastMCP.call_tool returned"""
+    if isinstance(output, tuple):
+        output = output[0]  # (content, structured output) in newer SDKs
+    if isinstance(output, dict):
+        return [{"type": "text", "text": json.dumps(output)}]
+    return [block.model_dump(mode="json", exclude_none=True) if hasattr(block, "model_dump")
+            else {"type": "text", "text": str(block)} for block in output]
+
+
+def register_batch_tool(mcp, max_concurrency: int = 8):
+    """Add batch_call_tool to a FastMCP server.
+
+    The tool takes a list of {"tool": name, "arguments": {...}} calls, runs
+    them on the server with bounded concurrency and returns a JSON array with
+    one {"tool", "success", "content" | "error"} item per call, in order.
+    """
+
+    @mcp.tool(
+        name=BATCH_TOOL_NAME,
+        description=(
+            "Call several tools of this server in one request. "
+            "calls is a list of {\"tool\": name, \"arguments\": {...}} objects; "
+            "results are returned in the same order, with an error per failed call."
+        ),
+    )
+    async def batch_call_tool(calls: List[Dict[str, Any]], max_concurrency: int = max_concurrency) -> str:
+        limit = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def run(call: Dict[str, Any]) -> Dict[str, Any]:
+            name = call.get("tool", "")
+            if name == BATCH_TOOL_NAME:
+                return {"tool": name, "success": False, "error": "Nested batch calls are not allowed"}
+            async with limit:
+                try:
+                    output = await mcp.call_tool(name, call.get("arguments") or {})
+                except Exception as e:
+                    return {"tool": name, "success": False, "error": str(e)}
+            return {"tool": name, "success": True, "content": _content_blocks(output)}
+
+        return json.dumps(await asyncio.gather(*(run(call) for call in calls)))
+
+    return batch_call_tool
+
+
+def decode_batch_result(result: Any) -> List[Dict[str, Any]]:
+    """Items of a batch_call_tool result, each successful one carrying a CallToolResult"""
+    text = "".join(getattr(block, "text", "") for block in result.content)
+    if getattr(result, "isError", False):
+        raise RuntimeError(text or "Batch call failed")
+    items = json.loads(text)
+    for item in items:
+        if item.get("success"):
+            item["result"] = CallToolResult.model_validate({"content": item.pop("content"), "isError": False})
+    return items
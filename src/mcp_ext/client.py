@@ -12,9 +12,71 @@ class MCPClient:
     def __init__(self):
         self.session: Optional[ClientSession] = None
         self.exit_stack = AsyncExitStack()
+        self._owner: Optional[asyncio.Task] = None
+        self._stop_requested: Optional[asyncio.Event] = None
 
-    async def connect_to_server(self, server_script_path: str):
-        """Connect to an MCP server."""
+    async def start(self, server_script_path: str, announce_tools: bool = True):
+        """Connect from a dedicated owner task.
+
+        MCP stdio transports must be closed by the task that opened them;
+        keeping the connection in its own task lets any task close it later
+        with stop().
+        """
+        ready = asyncio.get_running_loop().create_future()
+        self._stop_requested = asyncio.Event()
+
+        async def own():
+            # Close in every case: a failed or cancelled connect, a caller that
+            # gave up waiting (ready already cancelled), or stop()
+            try:
+                try:
+                    await self.connect_to_server(server_script_path, announce_tools)
+                except BaseException as e:
+                    if not ready.done():
+                        ready.set_exception(e)
+                    return
+                if ready.done():
+                    return
+                ready.set_result(None)
+                await self._stop_requested.wait()
+            finally:
+                await self.cleanup()
+
+        self._owner = asyncio.create_task(own())
+        try:
+            await ready
+        except asyncio.CancelledError:
+            self._stop_requested.set()
+            raise
+
+    async def stop(self):
+        """Close a connection opened with start() (or connect_to_server)"""
+        if self._owner is None:
+            await self.cleanup()
+            return
+        self._stop_requested.set()
+        try:
+            await self._owner
+        finally:
+            self._owner = None
+            self.session = None
+
+    async def ping(self) -> bool:
+        """Check that the server still answers"""
+        if not self.session:
+            return False
+        try:
+            await self.session.send_ping()
+            return True
+        except Exception:
+            return False
+
+    async def connect_to_server(self, server_script_path: str, announce_tools: bool = True):
+        """Connect to an MCP server.
+
+        announce_tools=False skips the extra list_tools round trip made only
+        to print the server's tool names.
+        """
         is_python = server_script_path.endswith('.py')
         is_js = server_script_path.endswith('.js')
         if not (is_python or is_js):
@@ -34,10 +96,11 @@ class MCPClient:
 
             await self.session.initialize()
 
-            # List available tools
-            response = await self.session.list_tools()
-            tools = response.tools
-            print("\nConnected to server with tools:", [tool.name for tool in tools])
+            if announce_tools:
+                # List available tools
+                response = await self.session.list_tools()
+                tools = response.tools
+                print("\nConnected to server with tools:", [tool.name for tool in tools])
         except Exception as e:
             await self.cleanup()  # Ensure cleanup on failure
             raise e
@@ -43,6 +43,8 @@ class MCPServerIntegrator:
             can_execute=True,
             description="EMF model operations"
         ))
+        # Sessions and their objects live in the server process: pooled calls must share one process
+        emf_server.metadata["stateful"] = True
         
         self.registry.register_mcp_server("emf_server", emf_server)
         return emf_server
\ No newline at end of file
@@ -0,0 +1,265 @@
+"""
+MCP Client Pool - Warm stdio sessions per server, leased to concurrent callers
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Any, AsyncIterator
+
+import anyio
+
+from src.core.config import config
+from src.mcp_ext.client import MCPClient
+
+# Errors meaning a pooled session's server process is gone
+TRANSPORT_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError, ConnectionError, EOFError)
+
+
+class _SpawnFailed:
+    """Queued in place of a client when spawning one failed, so a waiting lease fails too"""
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class _ServerPool:
+    """Warm sessions for one server script"""
+
+    def __init__(self, script_path: str, size: int):
+        self.script_path = script_path
+        self.size = size
+        self.idle: asyncio.Queue = asyncio.Queue()
+        self.leased: set = set()
+        self.last_used: Dict[int, float] = {}
+        self.spawning = 0
+        self.queued_failures = 0
+        self.spawned = 0
+        self.spawn_failures = 0
+        self.replaced = 0
+        self.leases = 0
+        self.wait_seconds = 0.0
+        self.spawn_seconds_total = 0.0
+        self.spawn_seconds_max = 0.0
+        self.spawn_seconds_last: Optional[float] = None
+
+    @property
+    def idle_count(self) -> int:
+        return self.idle.qsize() - self.queued_failures
+
+    @property
+    def total(self) -> int:
+        return self.idle_count + len(self.leased) + self.spawning
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "leased": len(self.leased),
+            "idle": self.idle_count,
+            "spawning": self.spawning,
+            "spawned": self.spawned,
+            "spawn_failures": self.spawn_failures,
+            "replaced": self.replaced,
+            "leases": self.leases,
+            "lease_wait_seconds": self.wait_seconds,
+            "spawn_latency": {
+                "count": self.spawned,
+                "mean": (self.spawn_seconds_total / self.spawned) if self.spawned else 0,
+                "max": self.spawn_seconds_max,
+                "last": self.spawn_seconds_last,
+            },
+        }
+
+
+class MCPClientPool:
+    """Pool of warm MCP stdio sessions, keyed by server script.
+
+    Each server keeps up to `size` sessions, spawned on demand (or ahead of
+    time with warm()). A lease hands one session to a single caller at a time,
+    so concurrent callers no longer share one server process. Sessions that
+    fail with a transport error, or do not answer a health check after being
+    idle, are discarded and replaced in the background; so are sessions whose
+    call timed out or was cancelled, since the server may still be busy.
+
+    A server that keeps state between calls in process memory must see all
+    of them in one process: lease() and warm() take a per-server `size`, and
+    a size of 1 gives such a server a single session that every lease reuses.
+
+    The pool belongs to the event loop it is first used on; used from another
+    loop, it drops its sessions and starts over.
+    """
+
+    def __init__(self, size: Optional[int] = None, health_check_interval: Optional[float] = None,
+                 spans: Optional[Any] = None):
+        self.spans = spans  # Optional SpanRecorder timing server spawns as "connect"
+        self.size = max(1, size or config.mcp_pool_size)
+        self.health_check_interval = (config.mcp_health_check_interval
+                                      if health_check_interval is None else health_check_interval)
+        self._pools: Dict[str, _ServerPool] = {}
+        self._tasks: set = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _pool_for(self, script_path: str, size: Optional[int] = None) -> _ServerPool:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            if self._loop is not None:
+                self._abandon()
+            self._loop = loop
+        pool = self._pools.get(script_path)
+        if pool is None:
+            pool = self._pools[script_path] = _ServerPool(script_path, max(1, size or self.size))
+        return pool
+
+    def _abandon(self):
+        """Forget sessions opened on another loop, closing them there if it still runs"""
+        old_loop, pools = self._loop, self._pools
+        self._pools, self._tasks = {}, set()
+        if old_loop is None or not old_loop.is_running() or old_loop.is_closed():
+            return
+        for pool in pools.values():
+            clients = list(pool.leased)
+            while not pool.idle.empty():
+                item = pool.idle.get_nowait()
+                if isinstance(item, MCPClient):
+                    clients.append(item)
+            for client in clients:
+                asyncio.run_coroutine_threadsafe(client.stop(), old_loop)
+
+    def _spawn_in_background(self, pool: _ServerPool):
+        pool.spawning += 1
+        task = asyncio.create_task(self._spawn(pool))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _spawn(self, pool: _ServerPool):
+        start = time.perf_counter()
+        client = MCPClient()
+        try:
+            # A server stuck while spawning or initializing must not hold its pool slot forever
+            await asyncio.wait_for(client.start(pool.script_path, announce_tools=False),
+                                   config.default_timeout or None)
+        except Exception as e:
+            pool.spawning -= 1
+            pool.spawn_failures += 1
+            print(f"Failed to spawn MCP server {pool.script_path}: {str(e)}")
+            pool.queued_failures += 1
+            pool.idle.put_nowait(_SpawnFailed(e))
+            return
+        seconds = time.perf_counter() - start
+        pool.spawning -= 1
+        pool.spawned += 1
+        pool.spawn_seconds_total += seconds
+        pool.spawn_seconds_max = max(pool.spawn_seconds_max, seconds)
+        pool.spawn_seconds_last = seconds
+        if self.spans is not None and self.spans.enabled:
+            end_ns = time.perf_counter_ns()
+            self.spans.record("connect", end_ns - int(seconds * 1e9), end_ns, {"server": pool.script_path})
+        pool.last_used[id(client)] = time.monotonic()
+        pool.idle.put_nowait(client)
+
+    async def warm(self, script_path: str, count: Optional[int] = None, size: Optional[int] = None):
+        """Spawn sessions for a server until `count` (default: pool size) exist"""
+        pool = self._pool_for(script_path, size)
+        target = min(pool.size, count or pool.size)
+        while pool.total < target:
+            self._spawn_in_background(pool)
+        pending = [t for t in self._tasks if not t.done()]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _acquire(self, pool: _ServerPool, timeout: Optional[float]) -> MCPClient:
+        """A healthy idle session, waiting (spawn and health check included) at most `timeout`"""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        
+        def remaining() -> Optional[float]:
+            return None if deadline is None else max(0.0, deadline - loop.time())
+        
+        while True:
+            if pool.idle.empty() and pool.total < pool.size:
+                self._spawn_in_background(pool)
+            item = await asyncio.wait_for(pool.idle.get(), remaining())
+            if isinstance(item, _SpawnFailed):
+                pool.queued_failures -= 1
+                raise ConnectionError(f"Could not start MCP server {pool.script_path}: {item.error}") from item.error
+            idle = time.monotonic() - pool.last_used.get(id(item), time.monotonic())
+            if idle >= self.health_check_interval:
+                try:
+                    healthy = await asyncio.wait_for(item.ping(), remaining())
+                except BaseException:
+                    # A stuck ping leaves the session unusable; never return it to the pool
+                    self._discard(pool, item)
+                    raise
+                if not healthy:
+                    print(f"MCP server {pool.script_path} did not answer a health check, replacing it")
+                    self._discard(pool, item)
+                    continue
+            return item
+
+    @asynccontextmanager
+    async def lease(self, script_path: str, timeout: Optional[float] = None,
+                    size: Optional[int] = None) -> AsyncIterator[MCPClient]:
+        """Borrow a session for exclusive use; it returns to the pool on exit.
+        
+        `size` caps the sessions of this server (default: the pool size) when
+        its pool is first created.
+        """
+        pool = self._pool_for(script_path, size)
+        start = time.perf_counter()
+        client = await self._acquire(pool, timeout)
+        pool.wait_seconds += time.perf_counter() - start
+        pool.leases += 1
+        pool.leased.add(client)
+        broken = False
+        try:
+            yield client
+        except (*TRANSPORT_ERRORS, asyncio.TimeoutError, asyncio.CancelledError):
+            # A timed out or cancelled call may still be running in the server
+            broken = True
+            raise
+        finally:
+            pool.leased.discard(client)
+            if broken:
+                self._discard(pool, client)
+            else:
+                pool.last_used[id(client)] = time.monotonic()
+                pool.idle.put_nowait(client)
+
+    def _discard(self, pool: _ServerPool, client: MCPClient):
+        """Close a dead session and spawn its replacement in the background"""
+        pool.last_used.pop(id(client), None)
+        pool.replaced += 1
+        task = asyncio.create_task(self._close_quietly(client))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        if pool.total < pool.size:
+            self._spawn_in_background(pool)
+
+    @staticmethod
+    async def _close_quietly(client: MCPClient):
+        try:
+            await client.stop()
+        except Exception as e:
+            print(f"Error closing MCP client: {str(e)}")
+
+    def metrics(self, script_path: Optional[str] = None) -> Dict[str, Any]:
+        """Per-server pool metrics (leased, idle, spawn latency, ...)"""
+        if script_path is not None:
+            pool = self._pools.get(script_path)
+            return pool.metrics() if pool else {}
+        return {path: pool.metrics() for path, pool in self._pools.items()}
+
+    async def close(self):
+        """Close every idle session and wait for background work"""
+        if self._loop is not None and self._loop is not asyncio.get_running_loop():
+            self._abandon()
+            return
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        for pool in self._pools.values():
+            while not pool.idle.empty():
+                item = pool.idle.get_nowait()
+                if isinstance(item, MCPClient):
+                    await self._close_quietly(item)
+            for client in list(pool.leased):
+                await self._close_quietly(client)
+            pool.leased.clear()
+        self._pools = {}
@@ -0,0 +1,54 @@
+import pytest
+
+from src.agents.keyword_index import KeywordIndex, tokenize
+
+# Transformations enabled on the ATL server, as exposed by atl_mcp_server
+ATL_TRANSFORMATIONS = [
+    "Class2Relational", "DSL2KM3", "Families2Persons", "KM32DOT", "KM32EMF", "MySQL2KM3",
+    "Partial2totalRoleB", "R2ML2WSDL", "UML2KM3", "XML2R2ML", "XML2SpreadsheetMLSimplified",
+]
+
+
+@pytest.mark.parametrize("name, words", [
+    ("Class2Relational", ["class", "relational"]),
+    ("Families2Persons", ["families", "persons"]),
+    ("KM32DOT", ["km3", "dot"]),
+    ("KM32EMF", ["km3", "emf"]),
+    ("DSL2KM3", ["dsl", "km3"]),
+    ("UML2KM3", ["uml", "km3"]),
+    ("MySQL2KM3", ["my", "sql", "km3"]),
+    ("R2ML2WSDL", ["r2ml", "wsdl"]),
+    ("XML2R2ML", ["xml", "r2ml"]),
+    ("Partial2totalRoleB", ["partial", "total", "role", "b"]),
+    ("XML2SpreadsheetMLSimplified", ["xml", "spreadsheet", "ml", "simplified"]),
+])
+def test_tokenize_transformation_names(name, words):
+    assert tokenize(name) == words
+
+
+def test_tokenize_tool_names():
+    assert tokenize("apply_KM32DOT_transformation_tool") == ["apply", "km3", "dot", "transformation", "tool"]
+    assert tokenize("list_transformation_R2ML2WSDL_tool") == ["list", "transformation", "r2ml", "wsdl", "tool"]
+
+
+def _atl_index() -> KeywordIndex:
+    index = KeywordIndex()
+    for name in ATL_TRANSFORMATIONS:
+        tool = f"apply_{name}_transformation_tool"
+        index.add(tool, tool, f"Apply transformation {name}", {"name": tool})
+    return index
+
+
+def test_search_matches_letter_digit_identifiers():
+    index = _atl_index()
+    assert index.search("transform a KM3 model to DOT", k=1)[0].id == "apply_KM32DOT_transformation_tool"
+    assert {hit.id for hit in index.search("R2ML", k=5)} == {
+        "apply_R2ML2WSDL_transformation_tool", "apply_XML2R2ML_transformation_tool"}
+
+
+def test_remove_forgets_terms():
+    index = _atl_index()
+    assert index.remove(["apply_KM32DOT_transformation_tool"]) == 1
+    assert "apply_KM32DOT_transformation_tool" not in index
+    assert all(hit.id != "apply_KM32DOT_transformation_tool" for hit in index.search("KM3 DOT", k=20))
+    assert index.scores("dot") == {}